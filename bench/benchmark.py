@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# Name  : benchmark.py
+# Author: Rob Toscani
+# Description: Benchmark of the palindromes.py generator
+#
+# Runs the palindrome generator across a grid of palindrome lengths (-L),
+# minimum word lengths (-l), maximum word quantities (-q) and search engines (-E),
+# on the bundled synthetic word list (words.txt) so it runs offline, and reports
+# per grid point:
+# - startup time: module import, dictionary compile (cold cache), dictionary load
+#   (warm cache) and generator setup, and the warm startup (import, load and setup)
+#   against the startup target of palindromes.py;
+# - candidates per second: primary sides from combine() for the default engine,
+#   search steps for the bidirectional engine;
+# - palindromes per second, and hit rate as palindromes per candidate;
+# - peak memory (maximum resident set size).
+#
+# Each grid point runs in a fresh process of the same interpreter, so that CPython
+# and PyPy numbers can be compared. With a fixed --seed, and with each point limited
+# by the number of candidates rather than by time, the work done is reproducible
+# and comparable between versions.
+#
+# Example, comparing CPython and PyPy:
+# 	python3 bench/benchmark.py --seed 1
+# 	pypy3 bench/benchmark.py --seed 1
+#
+######################################################################################
+#
+# Copyright (C) 2024 Rob Toscani <rob_toscani@yahoo.com>
+#
+# benchmark.py is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# benchmark.py is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+######################################################################################
+#
+import getopt
+import sys
+import os
+import json
+import time
+import itertools
+import resource
+import subprocess
+import tempfile
+
+benchdir = os.path.dirname(os.path.abspath(__file__))
+
+
+class BudgetExhausted(Exception):
+    """Raised from within the generator once a grid point has used its candidates or time:"""
+
+
+def run_point(point):
+    """Run one grid point in this process and return its metrics:"""
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.dirname(benchdir))
+    import palindromes
+    import_time = time.perf_counter() - start
+
+    # Startup: compile into an empty cache, then load from the warm cache:
+    with tempfile.TemporaryDirectory() as cachedir:
+        palindromes.cachedir = cachedir
+        start = time.perf_counter()
+        palindromes.WordIndex.load(point["wordlist"], "bench")
+        compile_time = time.perf_counter() - start
+        start = time.perf_counter()
+        index = palindromes.WordIndex.load(point["wordlist"], "bench")
+        config = palindromes.Config(point["min_word_len"], point["max_word_qty"],
+                                    point["total_len"], seed=point["seed"],
+                                    engine=point["engine"])
+        generator = palindromes.PalindromeGenerator(index, config)
+        load_time = time.perf_counter() - start
+
+    # Count the candidates, by wrapping the generator's primary side combinator
+    # or the recursive step of the bidirectional search:
+    candidates = 0
+    deadline = time.perf_counter() + point["time"]
+    name = "extend" if point["engine"] == "bidi" else "combine"
+    method = getattr(generator, name)
+
+    def counted(*args):
+        nonlocal candidates
+        for candidate in method(*args):
+            candidates += 1
+            if candidates > point["candidates"] or time.perf_counter() > deadline:
+                raise BudgetExhausted()
+            yield candidate
+
+    def counted_step(*args):
+        nonlocal candidates
+        candidates += 1
+        if candidates > point["candidates"] or time.perf_counter() > deadline:
+            raise BudgetExhausted()
+        return method(*args)
+
+    setattr(generator, name, counted_step if name == "extend" else counted)
+
+    results = 0
+    start = time.perf_counter()
+    try:
+        for result in generator.generate():
+            results += 1
+    except BudgetExhausted:
+        candidates -= 1
+    elapsed = time.perf_counter() - start
+
+    return {"engine": point["engine"], "total_len": point["total_len"],
+            "min_word_len": point["min_word_len"], "max_word_qty": point["max_word_qty"],
+            "seed": point["seed"], "import_ms": import_time * 1000,
+            "compile_ms": compile_time * 1000, "load_ms": load_time * 1000,
+            "startup_ms": (import_time + load_time) * 1000,
+            "startup_target_ms": palindromes.startup_target * 1000,
+            "candidates": candidates, "palindromes": results, "seconds": elapsed,
+            "candidates_per_s": candidates / elapsed if elapsed else 0,
+            "palindromes_per_s": results / elapsed if elapsed else 0,
+            "hit_rate": results / candidates if candidates else 0,
+            "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def print_table(rows):
+    """Print the metrics of all grid points as a table:"""
+    print("%-7s %3s %3s %5s | %7s %8s %7s %8s | %9s %7s %11s %9s | %7s" %
+          ("engine", "L", "l", "q", "import", "compile", "load", "startup", "cand/s", "pal/s",
+           "pal/cand", "cand", "peakMB"))
+    for row in rows:
+        print("%-7s %3d %3d %5d | %6.1fms %6.1fms %5.1fms %6.1fms%s | %9.1f %7.1f %11.5f %9d | %7.1f" %
+              (row["engine"], row["total_len"], row["min_word_len"], row["max_word_qty"],
+               row["import_ms"], row["compile_ms"], row["load_ms"], row["startup_ms"],
+               "!" if row["startup_ms"] > row["startup_target_ms"] else " ",
+               row["candidates_per_s"], row["palindromes_per_s"], row["hit_rate"],
+               row["candidates"], row["peak_mb"]))
+    if len(rows):
+        print("Startup target %.0fms (warm cache): met at %d of %d points (! if not)" %
+              (rows[0]["startup_target_ms"],
+               sum(row["startup_ms"] <= row["startup_target_ms"] for row in rows), len(rows)))
+
+
+def int_list(arg):
+    """Convert comma-separated argument to list of integers:"""
+    return [ int(item) for item in arg.split(",") ]
+
+
+usage = """
+Usage:
+benchmark.py [OPTIONS]
+\t--seed SEED
+\t	Random seed for reproducible runs (default 1)
+\t--lengths LENGTHS
+\t	Comma-separated palindrome lengths, -L (default 14,20,26)
+\t--min-lengths MINWORDLENS
+\t	Comma-separated minimum word lengths, -l (default 3,4)
+\t--quantities MAXQTYS
+\t	Comma-separated maximum word quantities, -q (default 4,1000)
+\t--engines ENGINES
+\t	Comma-separated search engines, -E (default combine,bidi)
+\t--candidates COUNT
+\t	Candidates per grid point (default 20000)
+\t--time SECONDS
+\t	Maximum time per grid point (default 20)
+\t--wordlist FILE
+\t	Word list (default: the bundled synthetic word list)
+\t--json	Write the metrics as JSON lines instead of a table
+\t--help	Help (this output)
+"""
+
+
+def main():
+    """Command line interface:"""
+    seed = 1
+    lengths = [14, 20, 26]
+    min_lengths = [3, 4]
+    quantities = [4, 1000]
+    engines = ["combine", "bidi"]
+    candidates = 20000
+    seconds = 20
+    wordlist = os.path.join(benchdir, "words.txt")
+    jsonmode = 0
+
+    try:
+        options, non_option_args = getopt.getopt(sys.argv[1:], '',
+                ['seed=', 'lengths=', 'min-lengths=', 'quantities=', 'engines=',
+                 'candidates=', 'time=', 'wordlist=', 'json', 'help', 'point='])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit()
+
+    for opt, arg in options:
+        if opt == '--help':
+            print(usage)
+            sys.exit()
+        elif opt == '--point':                # Internal: run one grid point
+            print(json.dumps(run_point(json.loads(arg))))
+            sys.exit()
+        elif opt == '--seed':
+            seed = int(arg)
+        elif opt == '--lengths':
+            lengths = int_list(arg)
+        elif opt == '--min-lengths':
+            min_lengths = int_list(arg)
+        elif opt == '--quantities':
+            quantities = int_list(arg)
+        elif opt == '--engines':
+            engines = arg.split(",")
+        elif opt == '--candidates':
+            candidates = int(arg)
+        elif opt == '--time':
+            seconds = float(arg)
+        elif opt == '--wordlist':
+            wordlist = os.path.abspath(arg)
+        elif opt == '--json':
+            jsonmode = 1
+
+    rows = []
+    for engine, total_len, min_word_len, max_word_qty in \
+            itertools.product(engines, lengths, min_lengths, quantities):
+        point = {"engine": engine, "total_len": total_len, "min_word_len": min_word_len,
+                 "max_word_qty": max_word_qty, "seed": seed, "candidates": candidates,
+                 "time": seconds, "wordlist": wordlist}
+        process = subprocess.run([sys.executable, os.path.abspath(__file__),
+                                  "--point", json.dumps(point)],
+                                 stdout=subprocess.PIPE, check=True)
+        row = json.loads(process.stdout)
+        if jsonmode:
+            print(json.dumps(row), flush=True)
+        rows.append(row)
+
+    if not jsonmode:
+        print("%s %s, seed %d, %d candidates or %gs per point" %
+              (sys.implementation.name, sys.version.split()[0], seed, candidates, seconds))
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,15 +24,15 @@
 #    and punctuation removed) and remove the spaces;
 # 8. Mirror the part on the primary side plus the 'skew' part of the
 #    middle word to the secondary side;
-# 9. Recursively divide the resulting normalized secondary string
-#    into all possible substring partitions;
-# 10. While dividing, compare each partition with all existing unique
-#     normalized words;
-# 11. These are looked up as keys in a dictionary. If a match is found,
-#     all associated real words (including punctuation, accent marks
-#     and case) are a candidate for placement on that position;
-# 12. If no match is found, abort the current recursion, backtrack to
-#     the latest match, and create new partitions from there, etc.;
+# 9. Divide the resulting normalized secondary string into all possible
+#    substring partitions, depth-first on an explicit stack;
+# 10. While dividing, walk the string through a prefix trie of all
+#     existing unique normalized words, one character at a time;
+# 11. Each trie node at which a normalized word ends holds its ID, under
+#     which all associated real words (including punctuation, accent marks
+#     and case) are found, which are a candidate for placement on that position;
+# 12. As soon as no word continues the prefix, abort the current partition,
+#     backtrack to the latest match, and create new partitions from there, etc.;
 # 13. If each and every partition of a string matches an existing word,
 #     the full string qualifies as a solution for the secondary side;
 # 14. Deduce from the sign of the midword skew which of the primary and
@@ -68,63 +68,107 @@
 #
 ######################################################################################
 #
+import time
+import_start = time.perf_counter()    # Start of the module import, for the startup time
 import getopt
 import sys
+import os
 import math
+import itertools
+import hashlib
+import json
+import threading
+from array import array
+from bisect import bisect_right
 import re
 import random
-import unicodedata
-from unidecode import unidecode
+from functools import lru_cache
+from collections import namedtuple
+# Imported only where needed, as they take long to import compared to a warm start:
+# asyncio (option --serve), multiprocessing (options -j and --serve), gzip and lzma
+# (compressed word lists) and unidecode (normalization of new characters).
 
 
-def to_list(file, language):
-    """Convert language file to dictionarylist:"""
+def read_words(file, language=None):
+    """Read a language file or word list (option --wordlist) in chunks of wordlist_chunk lines,
+       yielding per chunk the list of words and the list of their frequencies, being the
+       numbers in an optional second column after a tab (1 if missing), or None if there are
+       none in the chunk. Files ending in .gz or .xz are decompressed on the fly:"""
     if language == "g": # German language file
                         # Not UTF-8 encoded and contains superfluous text, so re-encode:
-        with open(file,'r', encoding='ISO-8859-1') as language:
-            dictionarylist = [word.replace("\n","") for word in language.readlines()]
-        return [ slashtag.sub('', line) for line in dictionarylist if line[0] != "#" ]
+        encoding = 'ISO-8859-1'
     else:
-        with open(file,'r') as language:
-            dictionarylist = [word.replace("\n","") for word in language.readlines()]
-        return dictionarylist
+        encoding = 'UTF-8'
+    extension = os.path.splitext(file)[1]
+    if extension == ".gz":
+        import gzip
+        opener = gzip.open
+    elif extension == ".xz":
+        import lzma
+        opener = lzma.open
+    else:
+        opener = open
+    number = 0                    # Line number before the chunk
+    with opener(file, 'rt', encoding=encoding) as lines:
+        while True:
+            chunk = ''.join(itertools.islice(lines, wordlist_chunk))
+            if len(chunk) == 0:
+                return
+            if chunk[-1] == "\n":
+                chunk = chunk[:-1]      # Newline at end of chunk
+            words = chunk.split("\n")
+            frequencies = None
+            if "\t" in chunk:
+                columns = [ word.split("\t") for word in words ]
+                words = [ fields[0] for fields in columns ]
+                frequencies = []
+                for n, fields in enumerate(columns, number + 1):
+                    try:
+                        frequency = float(fields[1]) if len(fields) > 1 else 1
+                        if not 0 <= frequency < math.inf:     # NaN, infinite or negative
+                            raise ValueError
+                    except ValueError:
+                        raise ValueError("%s:%d: invalid word frequency" % (file, n)) from None
+                    frequencies.append(frequency)
+            if language == "g":
+                words = [ slashtag.sub('', word) if word[:1] != "#" else None for word in words ]
+                if frequencies is not None:
+                    frequencies = [ frequency for word, frequency in zip(words, frequencies)
+                                    if word is not None ]
+                words = [ word for word in words if word is not None ]
+            number += chunk.count("\n") + 1
+            yield words, frequencies
 
 
-def contains(string, characters):
-    """Check if string contains any of characters:"""
-    for char in characters:
-        if char in string:
-            return True          # one of more of characters is in string
-    return False                 # none of characters is in string
+def exclusion(characters):
+    """Compile a regular expression that finds any of characters in a string, or None:"""
+    if len(characters) == 0:
+        return None
+    return re.compile('[%s]' % re.escape(characters))
 
 
-def __normalize(string):
+def normalize(string):
     """ Normalize all characters to lower case, remove accent marks and other non-alphanumeric characters
         https://stackoverflow.com/questions/517923/what-is-the-best-way-to-remove-accents-normalize-in-a-python-unicode-string"""
-    string = ''.join(c for c in unicodedata.normalize('NFD', string.lower())
-                  if unicodedata.category(c) != 'Mn')
-    return intpunct.sub('', string)
+    extend_normal_chars(string)
+    return string.translate(normal_chars)
 
 
-def normalize(string):
-    """ Normalize all characters to lower case, remove accent marks and other non-alphanumeric characters
-        https://stackoverflow.com/questions/517923/what-is-the-best-way-to-remove-accents-normalize-in-a-python-unicode-string"""
-    return intpunct.sub('', unidecode(string.lower()))
+def normalize_all(strings):
+    """Normalize a list of strings, looking up each distinct character only once:"""
+    extend_normal_chars(''.join(strings))
+    return [ string.translate(normal_chars) for string in strings ]
 
 
-def _normalize(string):
-   # Obsolete
-    """ By means of regular expressions, normalize all characters to lower case,
-        remove accent marks and other non-alphanumeric characters:"""
-    string = a_acc.sub('a', \
-                e_acc.sub('e', \
-                i_acc.sub('i', \
-                o_acc.sub('o', \
-                u_acc.sub('u', \
-                n_til.sub('n', \
-                c_ced.sub('c', \
-                intpunct.sub('', string))))))))
-    return string.lower()
+def extend_normal_chars(string):
+    """Add the characters of string that are new to the translation table of normalized characters:"""
+    new = [ char for char in set(string) if ord(char) not in normal_chars ]
+    for char in new:
+        if char.isascii():        # Left as is by unidecode, so it needn't be imported
+            normal_chars[ord(char)] = intpunct.sub('', char.lower())
+        else:
+            from unidecode import unidecode
+            normal_chars[ord(char)] = intpunct.sub('', unidecode(char.lower()))
 
 
 def get_skews(string):
@@ -132,191 +176,1869 @@ def get_skews(string):
        at either end to result into the remaining (end)string being symmetric:"""
     skews = []
     l = len(string)
-    for s in range(0, l):
-        string_r = string[:l-s]
-        string_l = string[s:]
-        if string_r == string_r[::-1]:
-            skews.append(-s)      # Skew = negative if chars are removed from the right
-        if s > 0 and string_l == string_l[::-1]:
-            skews.append(s)       # Skew = positive if chars are removed from the left
+    if l == 0:
+        return skews
+    # A remaining string can only be symmetric if it ends with the first character or
+    # begins with the last one, so only those are found (from the longest remaining string
+    # down) and compared to their reverse, merged in order of increasing skew:
+    first = string[0]
+    last = string[-1]
+    end = string.rfind(first)         # Last index of the remaining string if right chars removed
+    begin = string.find(last, 1)      # First index of the remaining string if left chars removed
+    while end >= 0 or begin >= 0:
+        if end >= 0 and (begin < 0 or l - 1 - end <= begin):
+            string_r = string[:end+1]
+            if string_r == string_r[::-1]:
+                skews.append(end + 1 - l) # Skew = negative if chars are removed from the right
+            end = string.rfind(first, 0, end)
+        else:
+            string_l = string[begin:]
+            if string_l == string_l[::-1]:
+                skews.append(begin)   # Skew = positive if chars are removed from the left
+            begin = string.find(last, begin + 1)
     return skews                  # List of skews, sorted by increasing absolute value
 
 
-def combine(wordslist, total_len, search_words):
-    """Mid-word and search-words (pre-)combinator:"""
-    midword_mode = 1        # If midword_mode = 1, palindrome includes a midword, else not
-    restricted = 0          # If restricted (= 1), midword won't use a search word
-    i = -1                  # Wordslist index initialization
-    j = 0                   # Search-word list index initialization
-    while True:
-        search_remain = [ x for x in search_words ]   # Remaining search words
-        if sorted_order:                              # Option -S (sorted order)
-            i += 1                                    # Incremental wordslist index,
+def compile_dictionary(sources, excl_chars, times):
+    """Convert the language files or word lists in sources, pairs of a file and its language,
+       to the compiled dictionary: a dictionary of compact tables, as listed in
+       dictionary_tables and described in WordIndex. The files are streamed in chunks of
+       wordlist_chunk lines, each filtered, normalized and added to the tables at once, so
+       that the raw lists are never held in memory. The durations of the stages are added
+       to times:"""
+    start = time.perf_counter()
+    times["normalize"] = times["skews"] = 0
+    chunks = itertools.chain.from_iterable(read_words(file, language)
+                                           for file, language in sources)
+    excluded = exclusion(excl_chars)
+    shortest = 10
+    parts = []                    # The words table, in parts of one chunk each
+    word_starts = array('i', [0])
+    lengths = array('i')
+    word_keys = array('i')        # Provisional key IDs, in order of appearance
+    skew_starts = array('i', [0])
+    skews = array('i')
+    frequencies = array('d')
+    weighted = False              # Whether any word has a frequency
+    known = {}                    # Provisional key ID per normalized string, ...
+    key_skews = []                # ... and skews per provisional key ID, as those often recur
+    for words, chunk_frequencies in chunks:
+        shortest = min(shortest, min(map(len, words), default=10))
+        split = time.perf_counter()
+        if chunk_frequencies is None:
+            chunk = [ (word, 1) for word in words ]
         else:
-            i = int(random.random() * len(wordslist)) # Random wordslist index,
-        if midword_mode:
-            if len(search_words) == 0 or restricted:
-                midword = wordslist[i]                # Pick from dictionary list
+            chunk = list(zip(words, chunk_frequencies))
+            weighted = True
+        if excluded:
+            chunk = [ entry for entry in chunk if not excluded.search(entry[0]) ]
+        normalized = normalize_all([ word for word, frequency in chunk ])
+        times["normalize"] += time.perf_counter() - split
+        split = time.perf_counter()
+        # Without the words that have nothing to mirror, e.g. only punctuation:
+        chunk = [ (word, frequency, norm) for (word, frequency), norm in zip(chunk, normalized)
+                  if len(norm) ]
+        chunk_keys = []
+        for word, frequency, norm in chunk:
+            k = known.get(norm)
+            if k is None:
+                k = known[norm] = len(key_skews)
+                key_skews.append(get_skews(norm))
+            chunk_keys.append(k)
+        word_keys.extend(chunk_keys)
+        # The start of each next word and skews follows on the last one of the tables:
+        word_starts.extend(itertools.accumulate((len(word) + 1 for word, frequency, norm in chunk),
+                                                initial=word_starts.pop()))
+        lengths.extend(len(norm) for word, frequency, norm in chunk)
+        chunk_skews = [ key_skews[k] for k in chunk_keys ]
+        skews.extend(itertools.chain.from_iterable(chunk_skews))
+        skew_starts.extend(itertools.accumulate(map(len, chunk_skews), initial=skew_starts.pop()))
+        frequencies.extend(frequency for word, frequency, norm in chunk)
+        if len(chunk):
+            parts.append('\n'.join(word for word, frequency, norm in chunk))
+        times["skews"] += time.perf_counter() - split
+    times["read"] = time.perf_counter() - start - times["normalize"] - times["skews"]
+    start = time.perf_counter()
+    keys = sorted(known)          # The unique normalized words, their position is the key ID
+    key_ids = array('i', bytes(4 * len(keys)))   # Key ID per provisional key ID
+    for k, key in enumerate(keys):
+        key_ids[known[key]] = k
+    del known, key_skews
+    word_keys = array('i', [ key_ids[k] for k in word_keys ])
+    counts = [0] * len(keys)
+    for k in word_keys:
+        counts[k] += 1
+    tables = {
+        "words": '\n'.join(parts),
+        # The last key also ends with a newline, so that every key can be found by its ending:
+        "keys": ''.join([ key + '\n' for key in keys ]),
+        "word_starts": word_starts,
+        "key_starts": array('i', itertools.accumulate((len(key) + 1 for key in keys),
+                                                      initial=0)),
+        "lengths": lengths,
+        "word_keys": word_keys,
+        # Word IDs grouped by key ID, keeping the order of the language file (a stable sort):
+        "key_words": array('i', sorted(range(len(word_keys)), key=word_keys.__getitem__)),
+        "key_word_starts": array('i', itertools.accumulate(counts, initial=0)),
+        "skew_starts": skew_starts,
+        "skews": skews,
+        # Only if any word list has frequencies:
+        "frequencies": frequencies if weighted else array('d'),
+    }
+    tables["trie_chars"], tables["trie_first"], tables["trie_keys"] = build_trie(keys)
+    tables["rtrie_chars"], tables["rtrie_first"], tables["rtrie_keys"] = \
+        build_trie(keys, reverse=True)
+    times["index"] = time.perf_counter() - start
+    return shortest, tables
+
+
+def load_dictionary(sources, excl_chars, times=None):
+    """Load the compiled dictionary of the language files or word lists in sources, pairs of
+       a file and its language, from the cache, or compile and cache it if the cache is
+       missing or any of the files has changed since. Returns the shortest word length and
+       the dictionary of compact tables. The durations of the stages are added to times,
+       if given:"""
+    if times is None:
+        times = {}
+    start = time.perf_counter()
+    files = [ os.path.abspath(file) for file, language in sources ]
+    key = hashlib.sha1((cache_version + "\0" + "\0".join(files) + "\0" +
+                        excl_chars).encode()).hexdigest()
+    cachefile = os.path.join(cachedir, key + ".idx")
+    header = cache_version + ''.join(" %d %d" % (stat.st_mtime_ns, stat.st_size)
+                                     for stat in map(os.stat, files))
+    n = len(header.split())       # Number of header fields, followed by shortest and sizes
+    try:
+        with open(cachefile, 'rb') as cache:
+            fields = cache.readline().decode().split()
+            if ' '.join(fields[:n]) != header or len(fields) != n + 1 + len(dictionary_tables):
+                raise ValueError("stale cache")
+            shortest = int(fields[n])
+            tables = {}
+            for (name, typecode), size in zip(dictionary_tables, map(int, fields[n+1:])):
+                data = cache.read(size)
+                if len(data) != size:
+                    raise ValueError("truncated cache")
+                if typecode is None:
+                    tables[name] = data.decode()
+                else:
+                    tables[name] = array(typecode)
+                    tables[name].frombytes(data)
+    except (OSError, ValueError):
+        shortest, tables = compile_dictionary(sources, excl_chars, times)
+        try:
+            os.makedirs(cachedir, exist_ok=True)
+            data = [ tables[name].encode() if typecode is None else tables[name].tobytes()
+                     for name, typecode in dictionary_tables ]
+            with open(cachefile + ".tmp", 'wb') as cache:
+                cache.write(("%s %d %s\n" % (header, shortest,
+                                             ' '.join(str(len(part)) for part in data))).encode())
+                for part in data:
+                    cache.write(part)
+            os.replace(cachefile + ".tmp", cachefile)
+        except OSError:
+            pass                                  # Cache is optional, e.g. read-only home
+    times["load"] = time.perf_counter() - start
+    return shortest, tables
+
+
+def load_checkpoint(file, settings):
+    """Load the checkpoint of a sorted sweep (option --checkpoint), or start a new one if
+       the file doesn't exist. Raises ValueError if it's invalid or has other settings:"""
+    try:
+        with open(file) as checkpointfile:
+            checkpoint = json.load(checkpointfile)
+    except FileNotFoundError:
+        return {"settings": settings, "position": None, "results": 0, "done": False}
+    if type(checkpoint) is not dict or checkpoint.get("settings") != settings:
+        raise ValueError("checkpoint %s is of other settings" % file)
+    return checkpoint
+
+
+def save_checkpoint(file, checkpoint):
+    """Save the checkpoint of a sorted sweep, replacing the previous one at once:"""
+    with open(file + ".tmp", "w") as checkpointfile:
+        json.dump(checkpoint, checkpointfile)
+    os.replace(file + ".tmp", file)
+
+
+def permutelist(list1, list2 = []):
+    """Generate and yield all distinct list permutations of list1, each appended to list2.
+       Iterative, on one buffer: choice[depth] is the position in list1 of the item placed
+       at that depth, the next one tried being the first unused one after it whose value
+       wasn't tried at that depth before:"""
+    items = list1
+    n = len(items)
+    base = len(list2)
+    out = list(list2) + [None] * n
+    used = [False] * n
+    choice = [-1] * n
+    tried = [ [] for i in range(n) ]      # Values tried per depth, so that duplicates are skipped
+    depth = 0
+    while depth >= 0:
+        if depth == n:
+            yield out[:]
+            depth -= 1
+            continue
+        i = choice[depth]
+        if i >= 0:
+            used[i] = False               # Backtrack: take back the item placed at this depth
+        i += 1
+        while i < n and (used[i] or items[i] in tried[depth]):
+            i += 1
+        if i == n:                        # All items tried at this depth
+            choice[depth] = -1
+            tried[depth] = []
+            depth -= 1
+            continue
+        choice[depth] = i
+        used[i] = True
+        tried[depth].append(items[i])
+        out[base + depth] = items[i]
+        depth += 1
+
+
+def build_trie(keys, reverse=False, first_key=0):
+    """Build a compact prefix trie over the normalized words in keys (or over their reversed
+       representations if reverse), whose key IDs are their positions in keys plus first_key.
+       The nodes are numbered breadth-first, node 0 being the root, so that the children of
+       each node are consecutive and in alphabetical order. Returns three tables:
+       - chars[node] is the character leading to the node;
+       - the children of node are the nodes first[node] up to first[node+1];
+       - keys[node] is the key ID of the normalized word ending at the node, else -1.
+       The child of a node for a character is thus chars.find(char, first[node], first[node+1]),
+       being -1 if there's none:"""
+    if reverse:
+        keys = [ key[::-1] for key in keys ]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    strings = [ keys[k] for k in order ]
+    chars = [" "]
+    first = array('i')
+    ids = array('i', [order[0] + first_key if len(strings) and strings[0] == "" else -1])
+    # Built level by level: each node at a depth is the range (lo, hi) of the sorted strings
+    # with its prefix, the string equal to the prefix (if any) coming first. Its children
+    # are the runs in the range of the same character at the depth, in sorted order:
+    level = [(0, len(strings))]
+    depth = 0
+    while len(level):
+        children = []
+        for lo, hi in level:
+            first.append(len(chars))
+            if lo < hi and len(strings[lo]) == depth:
+                lo += 1
+            while lo < hi:
+                char = strings[lo][depth]
+                end = lo + 1
+                while end < hi and strings[end][depth] == char:
+                    end += 1
+                chars.append(char)
+                ids.append(order[lo] + first_key if len(strings[lo]) == depth + 1 else -1)
+                children.append((lo, end))
+                lo = end
+        level = children
+        depth += 1
+    first.append(len(chars))
+    return ''.join(chars), first, ids
+
+
+class Result(namedtuple("Result", "left mid right skew length")):
+    """One palindrome: the words on the left side, the midword (or empty string) and the words
+       on the right side, plus the midword skew and the normalized palindrome length:"""
+    __slots__ = ()
+
+    def __str__(self):
+        return ' '.join(self.left + ((self.mid, ) if len(self.mid) else ()) + self.right)
+
+
+class Stats:
+    """Counters of the generation stages, kept by each generator, and optionally (option
+       --stats) the time spent per stage, for a summary of where the time goes:"""
+    counters = ("primaries", "permutations", "rejected", "partition_attempts", "partitions",
+                "bidi_seeds", "bidi_steps", "repeated", "duplicates", "results",
+                "split_hits", "split_misses")
+
+    def __init__(self, timing=False):
+        self.timing = timing              # Also time the stages in the hot loops
+        self.times = {}
+        for name in self.counters:
+            setattr(self, name, 0)
+
+    def snapshot(self):
+        """Counters and times as a dictionary:"""
+        report = { name: getattr(self, name) for name in self.counters }
+        report["times"] = dict(self.times)
+        return report
+
+    def add(self, snapshot):
+        """Add the counters and times of a snapshot (of a worker process) to these:"""
+        for name in self.counters:
+            setattr(self, name, getattr(self, name) + snapshot[name])
+        for name, seconds in snapshot["times"].items():
+            self.times[name] = self.times.get(name, 0) + seconds
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0) + seconds
+
+    def timed(self, iterable, name):
+        """Iterate lazily over an iterable, adding the time spent in it to the stage name,
+           but not the time spent by the caller between its items:"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+
+class BudgetExhausted(Exception):
+    """Raised within the generator once its time or candidate budget is used up:"""
+
+
+class SeenSet:
+    """Set of the results seen before, so that repeated ones can be skipped, in bounded
+       memory: the items are kept exactly up to seen_limit of them, and from then on as
+       seen_bits bits of a Bloom filter. The filter may take an item for a repeated one that
+       isn't (about 1 in 500 at 5 million items), but never the reverse. The set can be saved
+       in a checkpoint as its state, and restored from it:"""
+
+    def __init__(self, limit=None, bits=None, state=None):
+        self.limit = seen_limit if limit is None else limit
+        self.bits = seen_bits if bits is None else bits   # A power of two
+        self.items = set()
+        self.bloom = None                 # The Bloom filter, once past the limit
+        self.last = (None, None)          # The last item looked up, and its hash and step
+        if state is not None and "bloom" in state:
+            import base64
+            self.bits = state["bits"]
+            self.bloom = bytearray(base64.b64decode(state["bloom"]))
+            self.items = None
+        elif state is not None:
+            self.items = set(state["items"])
+
+    def __contains__(self, item):
+        if self.bloom is None:
+            return item in self.items
+        bloom = self.bloom
+        mask = self.bits - 1
+        h, step = self._hash(item)
+        for k in range(seen_hashes):
+            bit = h & mask
+            if not bloom[bit >> 3] & (1 << (bit & 7)):
+                return False
+            h += step
+        return True
+
+    def state(self):
+        """The items as saved in a checkpoint: a list of them, or the Bloom filter in base64:"""
+        if self.bloom is None:
+            return {"items": list(self.items)}
+        import base64
+        return {"bits": self.bits, "bloom": base64.b64encode(self.bloom).decode("ascii")}
+
+    def add(self, item):
+        """Add an item, returning whether it is new:"""
+        if self.bloom is not None:
+            return self._set_bits(item)
+        if item in self.items:
+            return False
+        self.items.add(item)
+        if len(self.items) > self.limit:  # From now on keep the items in the Bloom filter
+            self.bloom = bytearray(self.bits // 8)
+            for old in self.items:
+                self._set_bits(old)
+            self.items = None
+        return True
+
+    def _hash(self, item):
+        """The hash of an item (a string) and its step, from which its bit positions in the
+           Bloom filter follow by double hashing. The hash is the same in every process, unlike
+           hash(), so that a saved filter still holds when restored:"""
+        if self.last[0] == item:          # Looked up first, then added
+            return self.last[1]
+        h = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "little")
+        self.last = (item, (h, (h >> 32) | 1))
+        return self.last[1]
+
+    def _set_bits(self, item):
+        """Set the bits of an item in the Bloom filter, returning whether any was unset:"""
+        bloom = self.bloom
+        mask = self.bits - 1
+        h, step = self._hash(item)
+        new = False
+        for k in range(seen_hashes):
+            bit = h & mask
+            if not bloom[bit >> 3] & (1 << (bit & 7)):
+                bloom[bit >> 3] |= 1 << (bit & 7)
+                new = True
+            h += step
+        return new
+
+
+class RecentSet:
+    """Set of the primary sides tried recently, so that repeated ones can be skipped, kept
+       exactly in bounded memory: once tried_limit items were added, they become the previous
+       generation of items and the one before is forgotten. A forgotten item is taken for a
+       new one when it repeats, but an item is never taken for a repeated one that isn't,
+       so that the generation doesn't stop for want of new primary sides while there are:"""
+
+    def __init__(self, limit=None):
+        self.limit = tried_limit if limit is None else limit
+        self.items = set()
+        self.previous = set()             # The items before the last rotation
+
+    def add(self, item):
+        """Add an item, returning whether it is new (or forgotten):"""
+        if item in self.items or item in self.previous:
+            return False
+        self.items.add(item)
+        if len(self.items) >= self.limit:
+            self.previous = self.items
+            self.items = set()
+        return True
+
+
+class Config:
+    """Palindrome generation settings, as set by the command line options:"""
+
+    def __init__(self, min_word_len=1, max_word_qty=1000, total_len=30, sorted_order=False,
+                 search_words=(), seed=None, engine="combine", part=0, parts=1):
+        self.min_word_len = min_word_len  # Minimum word length (option -l)
+        self.max_word_qty = max_word_qty  # Maximum word quantity (option -q)
+        self.total_len = total_len        # Approximate palindrome length (option -L)
+        self.sorted_order = sorted_order  # Sorted instead of random generation (option -S)
+        self.search_words = list(search_words) # Words to be included (non-option arguments)
+        self.seed = seed                  # Random seed, or None for an unpredictable sequence
+        self.engine = engine              # Search engine: "combine", "bidi" or "anchored" (-E)
+        self.part = part                  # Generate only this part of the sorted sweep,
+        self.parts = parts                # ... if divided in this many parts (option --range)
+        # Prevent negative min_word_len, total_len < min_word_len or max word quantity < 1:
+        if min_word_len <= 0 or total_len < min_word_len or max_word_qty < 1:
+            raise ValueError("invalid palindrome settings")
+        if engine not in engines:
+            raise ValueError("unknown search engine: %s" % engine)
+        if engine == "anchored" and len(self.search_words) == 0:
+            raise ValueError("the anchored search engine needs search words")
+        if not 0 <= part < parts:
+            raise ValueError("invalid part of the sweep")
+
+
+class WordIndex:
+    """Normalized word index of one language file, read-only and shared by any number of
+       generators (and by forked worker processes). Words are identified by their integer
+       word ID, their position in the language file (without the words with excluded
+       characters), and the unique normalized words by their key ID, their position in
+       alphabetical order. The index consists of compact tables instead of Python objects
+       per word:
+       - words and keys: the words and normalized words, as newline-separated string tables,
+         each starting at word_starts[ID] and key_starts[ID] respectively (the keys table
+         ends with a newline as well);
+       - lengths and word_keys: per word ID the normalized length and the key ID;
+       - key_words: the word IDs grouped by key ID, the group of a key ID starting at
+         key_word_starts[ID];
+       - skews: the symmetry skews of all words, those of a word ID starting at skew_starts[ID];
+       - frequencies: per word ID the frequency in the word list (1 if it has none), or
+         empty if none of the word lists has frequencies;
+       - trie_chars, trie_first and trie_keys: the prefix trie over the keys (see build_trie);
+       - rtrie_chars, rtrie_first and rtrie_keys: the prefix trie over the reversed keys, for
+         the bidirectional search:"""
+
+    def __init__(self, tables, shortest=10, excl_chars="", times=None):
+        self.times = times or {}          # Durations of the loading stages
+        self.shortest = shortest          # Length of the shortest word in the language file
+        self.excl_chars = excl_chars      # Characters excluded from the words
+        for name, typecode in dictionary_tables:
+            setattr(self, name, tables[name])
+        self.count = len(self.word_starts) - 1     # Number of words
+        self.key_count = len(self.key_starts) - 1  # Number of unique normalized words
+        self.trie = (self.trie_chars, self.trie_first, self.trie_keys)
+        self.rtrie = (self.rtrie_chars, self.rtrie_first, self.rtrie_keys)
+
+    def word(self, word_id):
+        """The word of a word ID:"""
+        return self.words[self.word_starts[word_id]:self.word_starts[word_id+1]-1]
+
+    def key(self, key_id):
+        """The normalized word of a key ID:"""
+        return self.keys[self.key_starts[key_id]:self.key_starts[key_id+1]-1]
+
+    def norm(self, word_id):
+        """The normalized word of a word ID:"""
+        return self.key(self.word_keys[word_id])
+
+    def word_skews(self, word_id):
+        """The list of symmetry skews of a word ID:"""
+        return self.skews[self.skew_starts[word_id]:self.skew_starts[word_id+1]].tolist()
+
+    def homographs(self, key_id):
+        """The word IDs with the normalized word of a key ID:"""
+        return self.key_words[self.key_word_starts[key_id]:self.key_word_starts[key_id+1]]
+
+    def find_word(self, word):
+        """The list of word IDs of a word, empty if it's not in the index:"""
+        return [ bisect_right(self.word_starts, match.start()) - 1 for match in
+                 re.finditer('^%s$' % re.escape(word), self.words, re.MULTILINE) ]
+
+    def key_id(self, norm):
+        """The key ID of a normalized word, -1 if it's not in the index:"""
+        chars, first, keys = self.trie
+        node = 0
+        for char in norm:
+            node = chars.find(char, first[node], first[node+1])
+            if node < 0:
+                return -1
+        return keys[node]
+
+    @classmethod
+    def load(cls, file, language, excl_chars="0123456789", wordlists=()):
+        """Build the index from the (cached) compiled language file, if any, and word lists
+           (option --wordlist):"""
+        times = {}
+        sources = [ (file, language) ] if file is not None else []
+        sources.extend((wordlist, None) for wordlist in wordlists)
+        shortest, tables = load_dictionary(sources, excl_chars, times)
+        return cls(tables, shortest, excl_chars, times)
+
+
+class PalindromeGenerator:
+    """Generator of palindromes for one configuration, on a prebuilt word index. The search
+       works on the integer word IDs and key IDs of the index; search words that aren't in
+       the index get the word IDs (and key IDs) following those of the index, and the empty
+       midword gets the last word ID:"""
+
+    def __init__(self, index, config):
+        start = time.perf_counter()
+        self.index = index
+        self.config = config
+        self.sorted_order = config.sorted_order
+        self.max_word_qty = config.max_word_qty
+        self.total_len = config.total_len
+        self.search_words = config.search_words
+        self.random = random.Random(config.seed)
+        self.feasible = True               # False if the search words can't be placed
+        self.stats = Stats()
+        self.worker_stats = {}             # Latest statistics per worker process
+        # Position in the sorted sweep (see generate), the one to resume from, and a function
+        # called with the position at most every checkpoint_interval seconds. The results
+        # generated so far (a SeenSet) are saved with the position, so that a resumed sweep
+        # skips them as well, and resumes with the state saved:
+        self.cursor = []
+        self.position = None
+        self.resume = None
+        self.checkpoint = None
+        self.seen = None
+        self.resume_seen = None
+        # Budgets of a run (options --timeout and --max-candidates), and why it stopped: "end",
+        # "time", "candidates", "exhausted" (no new palindromes found) or "empty" (settings
+        # for which there are no palindromes):
+        self.timeout = None
+        self.max_candidates = None
+        self.deadline = math.inf
+        self.candidate_limit = math.inf
+        self.stopped = None
+
+        # Prevent min_word_len to be smaller than shortest word in list:
+        self.min_word_len = max(config.min_word_len, index.shortest)
+
+        # Convert the search words to normalized words and join together to string:
+        norm_args = normalize(''.join(self.search_words))
+
+        # Length ratio between half palindrome and search string, used in combine():
+        if len(self.search_words):
+            self.length_ratio = max(1, self.total_len//(2*len(norm_args)))
+
+        # Words, normalized words and skews of the word IDs following those of the index:
+        self.extra_words = []
+        self.extra_norms = []
+        self.extra_skews = []
+        extra_keys = []                    # Normalized search words that aren't in the index
+        self.search_ids = []               # Word ID per search word
+        self.search_set = set()            # Word IDs of all words equal to a search word
+        self.norm_args_set = set()         # Key IDs of the normalized search words
+        self.search_keys = {}              # ... with the normalized search word per key ID
+        # Word IDs per key ID, overriding the index for the normalized search words:
+        self.overrides = {}
+        excluded = exclusion(index.excl_chars)
+        for word in self.search_words:
+            if excluded and excluded.search(word):
+                self.feasible = False
+            word_ids = index.find_word(word)
+            if word in self.extra_words:
+                word_ids = [ index.count + self.extra_words.index(word) ]
+            if len(word_ids):
+                normalized = self.norm(word_ids[0])
             else:
-                midword = search_words[j]             # Pick from search words
-                search_remain.remove(search_words[j])
-            # Available word quantity for primary side, minus midword:
-            max_qty = (max_word_qty - 1) // 2
-        else:
-            midword = ""
-            # Available word quantity for primary side, if no midword:
-            max_qty = max_word_qty // 2
-        w = len(dictionary_reduced[midword])
-        # Place the midword in the middle by all of its symmetry centers, by varying 'skew':
-        for s in symmetry_skews[midword]:
-            # Verify if the midword fits within the palindrome length:
-            if (w % 2 == s % 2 and (w - abs(s))//2 + abs(s) > total_len//2) or \
-                   (w % 2 != s % 2 and (w - abs(s))//2 + abs(s) > (total_len - 1)//2):
-            # Skews are sorted by rising absolute value, so we can quit loop once 1x false:
-                break
-            # Calculate remaining length for the words on the primary side:
-            length_remain = (total_len - w - abs(s)) // 2
-            wordresult = []
-            # Pre-fill the primary side with as many remaining and fitting search-words:
-            for k in range(len(search_remain)):
-                if len(wordresult) == max_qty:
-                    break
-                if length_remain >= len(dictionary_reduced[search_remain[k]]):
-                    wordresult.append(search_remain[k])
-                    length_remain = length_remain - len(dictionary_reduced[search_remain[k]])
+                normalized = normalize(word)
+                word_ids = [ index.count + len(self.extra_words) ]
+                self.extra_words.append(word)
+                self.extra_norms.append(normalized)
+                self.extra_skews.append(get_skews(normalized))
+            self.search_ids.append(word_ids[0])
+            self.search_set.update(word_ids)
+            if len(normalized) > self.total_len or \
+                    (self.max_word_qty == 1 and len(normalized) < self.total_len):
+                self.feasible = False
+            key = index.key_id(normalized)
+            if key < 0:
+                if normalized not in extra_keys:
+                    extra_keys.append(normalized)
+                key = index.key_count + extra_keys.index(normalized)
+            self.norm_args_set.add(key)
+            self.search_keys[key] = normalized
+            if key not in self.overrides:
+                if len(normalized) >= self.min_word_len and key < index.key_count:
+                    self.overrides[key] = list(index.homographs(key))
                 else:
+                    self.overrides[key] = []
+            if word_ids[0] not in self.overrides[key]:
+                self.overrides[key].append(word_ids[0])
+
+        # The empty midword:
+        self.empty = index.count + len(self.extra_words)
+        self.extra_words.append("")
+        self.extra_norms.append("")
+        self.extra_skews.append([0])
+
+        # Normalized length per word ID:
+        self.lengths = array('i', index.lengths)
+        self.lengths.extend(len(normalized) for normalized in self.extra_norms)
+
+        # Reduced wordlist, without words that are too short or too long:
+        min_len = self.min_word_len
+        max_len = self.total_len
+        if self.max_word_qty == 1:
+            min_len = self.total_len
+        lengths = self.lengths
+        search_set = self.search_set
+        self.dictlist_reduced = array('i', [ word for word in range(index.count)
+                                             if min_len <= lengths[word] <= max_len
+                                             or word in search_set ])
+        self.dictlist_reduced.extend(range(index.count, self.empty))
+
+        # Reduced wordlist bucketed by normalized length, with cumulative counts, so that the
+        # primary side combinators only draw or scan words that fit the remaining length:
+        self.words_by_length = array('i', sorted(self.dictlist_reduced,
+                                                 key=lengths.__getitem__))
+        bucket_lengths = [ lengths[word] for word in self.words_by_length ]
+        self.cumulative = [ bisect_right(bucket_lengths, length)
+                            for length in range(self.total_len + 1) ]
+        self.fitting = {}                  # Per maximum length, the words in sorted order
+
+        # Cumulative random sampling weights of the midwords and of words_by_length, by the
+        # word frequencies (option --wordlist), or None to sample uniformly:
+        self.midword_weights = None
+        self.length_weights = None
+        if len(index.frequencies):
+            self.midword_weights = array('d', itertools.accumulate(
+                map(self.word_weight, self.dictlist_reduced), initial=0))
+            self.length_weights = array('d', itertools.accumulate(
+                map(self.word_weight, self.words_by_length), initial=0))
+
+        # Tries for the secundary side: the index trie, plus one with the search words
+        # that are not in the index:
+        self.tries = [ index.trie ]
+        if len(extra_keys):
+            self.tries.append(build_trie(extra_keys, first_key=index.key_count))
+
+        # Words found at the start of the normalized suffixes of split tables, cached per
+        # suffix, as the mirrored strings themselves rarely repeat but their suffixes do:
+        self.suffix_words = lru_cache(maxsize=65536)(self._suffix_words)
+
+        # Placement index of the search words: per search word, the reversed normalized word
+        # that the other side must mirror. A search word that no dictionary words can mirror,
+        # not even with the words around it, can only be placed as the midword, by the skews
+        # at which it fits and its overhanging part can be mirrored (see midword_skews). If no
+        # search word can be placed either way, there are no palindromes at all, with any
+        # engine. In the anchored search (option -E anchored), a search word that can only be
+        # the midword is always the midword, so there are none if there are more of those:
+        self.advance = lru_cache(maxsize=65536)(self._advance)
+        self.placements = {}
+        self.anchor = None                 # Search-word index of the midword, if fixed
+        self.anchor_skews = []             # ... and its skews that can be mirrored
+        if len(self.search_ids):
+            placeable = False
+            for j in range(len(self.search_ids)):
+                normalized = self.norm(self.search_ids[j])
+                self.placements[self.search_ids[j]] = normalized[::-1]
+                if len(normalized) <= self.total_len // 2 and \
+                        self.mirrorable(normalized[::-1]):
+                    placeable = True
                     continue
-            # Stop if none of the search words fits the primary side nor matches the midword:
-            if len(search_words) and midword not in search_words and not len(wordresult):
-                break
+                skews = self.midword_skews(self.search_ids[j])
+                if len(skews):
+                    placeable = True
+                if config.engine == "anchored":
+                    if self.anchor is not None or len(skews) == 0:
+                        self.feasible = False
+                    self.anchor = j
+                    self.anchor_skews = skews
+            if not placeable:
+                self.feasible = False
+        self.times = {"generator": time.perf_counter() - start}
+
+        # The bidirectional search engine also walks the reversed words:
+        if config.engine == "bidi":
+            self.rtries = [ index.rtrie ]
+            if len(extra_keys):
+                self.rtries.append(build_trie(extra_keys, reverse=True,
+                                              first_key=index.key_count))
+
+    def word(self, word_id):
+        """The word of a word ID:"""
+        if word_id < self.index.count:
+            return self.index.word(word_id)
+        return self.extra_words[word_id - self.index.count]
+
+    def norm(self, word_id):
+        """The normalized word of a word ID:"""
+        index = self.index
+        if word_id < index.count:
+            key_id = index.word_keys[word_id]   # As index.norm(), inlined for speed
+            return index.keys[index.key_starts[key_id]:index.key_starts[key_id+1]-1]
+        return self.extra_norms[word_id - index.count]
+
+    def word_skews(self, word_id):
+        """The list of symmetry skews of a word ID:"""
+        if word_id < self.index.count:
+            return self.index.word_skews(word_id)
+        return self.extra_skews[word_id - self.index.count]
+
+    def homographs(self, key_id):
+        """The word IDs with the normalized word of a key ID:"""
+        if key_id in self.overrides:
+            return self.overrides[key_id]
+        return self.index.homographs(key_id)
+
+    def generate(self, shard=0, shards=1):
+        """Lazily generate distinct palindrome results, skipping those generated before
+           (see SeenSet). In sorted mode, the work can be divided over a number of shards,
+           in which case only the given shard is generated:"""
+        seen = self.seen = SeenSet(state=self.resume_seen)
+        self.stopped = "end"
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+        if self.max_candidates is not None:
+            self.candidate_limit = self.max_candidates
+        try:
+            for result in self._generate(shard, shards):
+                item = str(result)
+                if item in seen:
+                    self.stats.duplicates += 1
+                    continue
+                seen.add(item)
+                yield result
+        except BudgetExhausted as budget:
+            self.stopped = budget.args[0]
+
+    def check_budget(self, candidates):
+        """Stop generating once the time budget is used up, or the number of candidates
+           (primary sides, or bidirectional search steps) reaches the limit:"""
+        if candidates >= self.candidate_limit:
+            raise BudgetExhausted("candidates")
+        if time.monotonic() > self.deadline:
+            raise BudgetExhausted("time")
+
+    def _generate(self, shard, shards):
+        """Lazily generate palindrome results, including any duplicates:"""
+        if not self.feasible:
+            self.stopped = "empty"
+            return
+
+        # If option -q = 1 or option -l > palindrome-length/2, all single-word palindromes;
+        # the position is ([], 0, emitted), the number of results generated so far:
+        if self.max_word_qty == 1 or self.min_word_len * 2 > self.total_len:
+            emitted = 0
+            skip_results = self.resume[2] if self.resume is not None else 0
+            for word in self.dictlist_reduced:
+                if 0 in self.word_skews(word) and \
+                        (len(self.search_words) == 0 or word in self.search_set):
+                    emitted += 1
+                    self.position = ([], 0, emitted)
+                    if emitted > skip_results:
+                        yield Result((), self.word(word), (), 0, self.lengths[word])
+            return
+
+        if self.config.engine == "bidi":
+            yield from self.bidi(shard, shards)
+            return
+
+        # Otherwise, combine the dictionary words to multi-word palindromes. In sorted mode,
+        # the position is kept as (cursor, seen, emitted): the cursor of the primary side in
+        # the sweep (see combine), the number of primary sides seen before at that cursor
+        # (permutations) and the number of results of it generated so far. A sweep resumed
+        # from a position skips what was generated before. A primary side that was tried before
+        # would only yield duplicate results, so it's skipped (see RecentSet); primary sides
+        # repeat in random mode, and as permutations of the search words in sorted mode:
+        skip_primaries, skip_results = 0, 0
+        if self.resume is not None:
+            cursor, skip_primaries, skip_results = self.resume
+        saved = time.monotonic()
+        # In random mode, the generation stops once no new primary sides are found anymore:
+        tried = None
+        if not self.sorted_order or len(self.search_words):
+            tried = RecentSet()
+        repeats = 0                        # Repeated primary sides in a row
+        primaries = self.combine(self.dictlist_reduced, self.total_len, self.search_ids,
+                                 shard, shards)
+        if self.stats.timing:
+            primaries = self.stats.timed(primaries, "combine")
+        for (combination, midword, skew) in primaries:
+            self.check_budget(self.stats.primaries)
+            self.stats.primaries += 1
+            if not self.sorted_order:
+                if tried.add((tuple(combination), midword, skew)):
+                    repeats = 0
+                    yield from self.mirror(combination, midword, skew)
+                else:
+                    self.stats.repeated += 1
+                    repeats += 1
+                    if repeats == saturation:
+                        self.stopped = "exhausted"
+                        return
+                continue
+            if self.position is not None and self.position[0] == self.cursor:
+                self.position = (self.position[0], self.position[1] + 1, 0)
+            else:
+                self.position = (list(self.cursor), 0, 0)
+            if self.checkpoint is not None and time.monotonic() - saved >= checkpoint_interval:
+                self.checkpoint(self.position)
+                saved = time.monotonic()
+            if skip_primaries:
+                skip_primaries -= 1
+                continue
+            if tried is not None and not tried.add((tuple(combination), midword, skew)):
+                self.stats.repeated += 1
+                continue
+            for result in self.mirror(combination, midword, skew):
+                cursor, seen, emitted = self.position
+                self.position = (cursor, seen, emitted + 1)
+                if emitted >= skip_results:
+                    yield result
+            skip_results = 0
+
+    def mirror(self, combination, midword, skew):
+        """Generate the palindromes of one primary side, by mirroring its normalized string,
+           plus the 'skew' part of the midword, to the secundary side:"""
+        stats = self.stats
+        norm_primary = ''.join([ self.norm(word) for word in combination ])
+        norm_midword = self.norm(midword)
+
+        s = skew
+        w = len(norm_midword)
+        p = len(norm_primary)
+
+        if skew >= 0:
+            norm_string = (norm_primary + norm_midword)[:p+abs(s)]
+        elif skew < 0:
+            norm_string = (norm_midword + norm_primary)[w-abs(s):]
+
+        if len(norm_string) == 0:         # Iff primary is empty AND midword is palindrome!
+            # Hence result is the palindrome midword only:
+            yield Result((), self.word(midword), (), skew, w)
+            return
+
+        # Maximum word quantity on the secundary side, with or without midword:
+        if midword == self.empty:
+            max_qty = self.max_word_qty // 2
+        else:
+            max_qty = (self.max_word_qty - 1) // 2
+
+        # Reject the primary side at once if its mirror can't be split into few enough words:
+        if stats.timing:
+            start = time.perf_counter()
+            split_words, table = self.split_table(norm_string[::-1])
+            stats.add_time("split_table", time.perf_counter() - start)
+        else:
+            split_words, table = self.split_table(norm_string[::-1])
+        if table[0] > max_qty:
+            stats.rejected += 1
+            return
+        stats.partition_attempts += 1
+
+        # Generate results by mirroring the normalized string from primary to secundary side
+        length = p + w + len(norm_string)
+        primary = tuple([ self.word(word) for word in combination ])
+        midword = self.word(midword)
+        partitions = self.partitions(split_words, table, max_qty)
+        if stats.timing:
+            partitions = stats.timed(partitions, "partitions")
+        for partition in partitions:
+            stats.partitions += 1
+            yield from self.make_palindromes(partition, primary, midword, skew, length)
+
+    def generate_parallel(self, jobs):
+        """Lazily generate palindrome results in a pool of forked worker processes, which
+           share the read-only databases. Results are merged and deduplicated in this process;
+           the workers are terminated when the iteration is stopped or closed:"""
+        import multiprocessing
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue(maxsize=1000)
+        processes = [ context.Process(target=self._worker, args=(k, jobs, queue), daemon=True)
+                      for k in range(jobs) ]
+        for process in processes:
+            process.start()
+        seen = SeenSet()
+        done = 0
+        self.stopped = "end"
+        try:
+            while done < jobs:
+                result = queue.get()
+                if type(result) is str:       # A worker is done, for this reason
+                    done += 1
+                    if self.stopped == "end":
+                        self.stopped = result
+                    continue
+                if type(result) is tuple:     # Latest statistics of a worker
+                    self.worker_stats[result[0]] = result[1]
+                    continue
+                if not seen.add(str(result)): # Duplicate result
+                    self.stats.duplicates += 1
+                    continue
+                yield result
+        finally:
+            for process in processes:
+                process.terminate()
 
-            # Call the appropriate word combinator for the primary side:
-            if sorted_order:
-                yield from combine_sorted(wordslist, length_remain, wordresult,
-                                          len(wordresult), midword, s, max_qty)
+    def _worker(self, shard, shards, queue):
+        """Worker process generating its share of the palindromes, sent to the parent process,
+           together with its statistics every stats_interval seconds:"""
+        if self.config.seed is None:      # Forked workers must not share the random sequence
+            self.random.seed()
+        else:
+            self.random.seed("%s/%d" % (self.config.seed, shard))
+        if self.max_candidates is not None:   # The workers share the candidate budget
+            self.max_candidates = -(-self.max_candidates // shards)
+        stopped = threading.Event()
+
+        def send_stats():
+            while not stopped.wait(stats_interval):
+                queue.put((shard, self.snapshot_stats()))
+
+        threading.Thread(target=send_stats, daemon=True).start()
+        try:
+            for result in self.generate(shard, shards):
+                queue.put(result)
+        except KeyboardInterrupt:             # Ctrl-C is handled by the parent process
+            pass
+        finally:
+            stopped.set()
+            queue.put((shard, self.snapshot_stats()))
+            queue.put(self.stopped or "end")  # Done
+
+    def snapshot_stats(self):
+        """Statistics of this generator as a dictionary, including the suffix cache of the
+           split tables:"""
+        cache = self.suffix_words.cache_info()
+        self.stats.split_hits = cache.hits
+        self.stats.split_misses = cache.misses
+        return self.stats.snapshot()
+
+    def report_stats(self):
+        """Statistics of this generator, plus the latest of its worker processes, if any:"""
+        stats = Stats()
+        stats.add(self.snapshot_stats())
+        for snapshot in list(self.worker_stats.values()):
+            stats.add(snapshot)
+        return stats
+
+    def combine(self, wordslist, total_len, search_words, shard=0, shards=1):
+        """Mid-word and search-words (pre-)combinator, on word IDs. In sorted mode, the cursor
+           holds the position in the sweep: the wordslist index of the midword, the index of
+           its skew and the indices of the words on the primary side (see combine_sorted):"""
+        lengths = self.lengths
+        midword_mode = 1        # If midword_mode = 1, palindrome includes a midword, else not
+        restricted = 0          # If restricted (= 1), midword won't use a search word
+        i = -1                  # Wordslist index initialization
+        j = 0                   # Search-word list index initialization
+        if self.anchor is not None:
+            j = self.anchor     # Anchored search: this search word is always the midword
+        end = len(wordslist)    # Wordslist index at which the sorted sweep is complete
+        skew_start = 0          # Skew index to start from
+        resume = []             # Indices of the primary side words to start from
+        if self.sorted_order:
+            # Only the given part of the sweep (option --range), from the resumed position:
+            i = len(wordslist) * self.config.part // self.config.parts - 1
+            end = len(wordslist) * (self.config.part + 1) // self.config.parts
+            if self.resume is not None:
+                i = self.resume[0][0] - 1
+                skew_start = self.resume[0][1]
+                resume = self.resume[0][2:]
+            # The primary sides without midword or with a search word as midword don't depend
+            # on the index, so they are only swept at the first index with that midword:
+            firsts = {}                                   # First index per such midword
+            switches = (midword_mode, restricted, j)
+            for k in range(end):
+                if k == i + 1:                            # Switches as thrown before index i+1
+                    midword_mode, restricted, j = switches
+                if not switches[0]:
+                    firsts.setdefault(self.empty, k)
+                elif len(search_words) and not switches[1]:
+                    firsts.setdefault(search_words[switches[2]], k)
+                switches = self.switch(*switches)
+        while True:
+            self.check_budget(self.stats.primaries)
+            search_remain = [ x for x in search_words ]   # Remaining search words
+            if self.sorted_order:                         # Option -S (sorted order)
+                i += 1                                    # Incremental wordslist index,
+                if i >= end:                              # ... until the sweep is complete
+                    return
+            else:
+                i = self.pick(len(wordslist), self.midword_weights) # Random wordslist index,
+            if midword_mode:
+                if len(search_words) == 0 or restricted:
+                    midword = wordslist[i]                # Pick from dictionary list
+                else:
+                    midword = search_words[j]             # Pick from search words
+                    search_remain.remove(search_words[j])
+                # Available word quantity for primary side, minus midword:
+                max_qty = (self.max_word_qty - 1) // 2
             else:
-                yield from combine_random(wordslist, length_remain, wordresult,
-                                          len(wordresult), midword, s, max_qty)
+                midword = self.empty
+                # Available word quantity for primary side, if no midword:
+                max_qty = self.max_word_qty // 2
+            w = lengths[midword]
+            # In sorted parallel mode, each worker only takes its own share of indices, and of
+            # the first-level words of a sweep with a fixed midword, which runs at one index:
+            fixed = not midword_mode or (len(search_words) and not restricted)
+            split = (shard, shards) if fixed else (0, 1)
+            if self.sorted_order and (firsts[midword] != i if fixed else i % shards != shard):
+                skews = []
+            elif self.anchor is not None:
+                skews = self.anchor_skews
+            else:
+                skews = self.word_skews(midword)
+            # Place the midword in the middle by all of its symmetry centers, by varying 'skew':
+            for n in range(skew_start, len(skews)):
+                s = skews[n]
+                # Verify if the midword fits within the palindrome length:
+                if (w % 2 == s % 2 and (w - abs(s))//2 + abs(s) > total_len//2) or \
+                       (w % 2 != s % 2 and (w - abs(s))//2 + abs(s) > (total_len - 1)//2):
+                # Skews are sorted by rising absolute value, so we can quit loop once 1x false:
+                    break
+                # Calculate remaining length for the words on the primary side:
+                length_remain = (total_len - w - abs(s)) // 2
+                wordresult = []
+                # Pre-fill the primary side with as many remaining and fitting search-words:
+                for k in range(len(search_remain)):
+                    if len(wordresult) == max_qty:
+                        break
+                    if length_remain >= lengths[search_remain[k]]:
+                        wordresult.append(search_remain[k])
+                        length_remain = length_remain - lengths[search_remain[k]]
+                    else:
+                        continue
+                # Stop if none of the search words fits the primary side nor matches the midword:
+                if len(search_words) and midword not in self.search_set and not len(wordresult):
+                    break
+
+                # Call the appropriate word combinator for the primary side:
+                if self.sorted_order:
+                    self.cursor = [i, n]
+                    yield from self.combine_sorted(length_remain, wordresult,
+                                                   len(wordresult), midword, s, max_qty, resume,
+                                                   *split)
+                    resume = []
+                else:
+                    yield from self.combine_random(length_remain, wordresult,
+                                                   len(wordresult), midword, s, max_qty)
+            skew_start = 0
+            resume = []
+            midword_mode, restricted, j = self.switch(midword_mode, restricted, j)
+
+    def word_weight(self, word):
+        """Random sampling weight of a word ID, by its frequency in the word list:"""
+        if word < self.index.count:
+            return max(self.index.frequencies[word], 1) ** frequency_bias
+        return 1                 # Search words that aren't in the index, and the empty midword
+
+    def pick(self, count, weights=None):
+        """Random index below count, uniformly or, given the cumulative weights, weighted:"""
+        if weights is None:
+            return int(self.random.random() * count)
+        i = bisect_right(weights, self.random.random() * weights[count], 0, count + 1) - 1
+        return min(i, count - 1)
 
-        # Throw switches to decide whether of not to place a midword in the next palindrome:
+    def switch(self, midword_mode, restricted, j):
+        """Throw the switches of combine() for the next midword:"""
+        if self.anchor is not None:             # Anchored search: always the same midword
+            return midword_mode, restricted, j
+        # Decide whether of not to place a midword in the next palindrome:
         midword_mode = (midword_mode + 1) % 5   # Choice: skip midword after each 5 midwords
 
         # ... and whether or not to place a search-word in the middle of the next palindrome:
-        if len(search_words) and midword_mode:
-            restricted = (restricted + 1) % length_ratio
+        if len(self.search_words) and midword_mode:
+            restricted = (restricted + 1) % self.length_ratio
             if not restricted:
-                j = (j + 1) % len(search_words) # The search words are available for the midword
+                j = (j + 1) % len(self.search_words) # Search words are available for the midword
+        return midword_mode, restricted, j
 
+    def fitting_words(self, length):
+        """Reduced wordlist, in sorted order, of the words with a normalized representation
+           not longer than length, built once per length:"""
+        words = self.fitting.get(length)
+        if words is None:
+            lengths = self.lengths
+            words = array('i', [ word for word in self.dictlist_reduced
+                                 if lengths[word] <= length ])
+            self.fitting[length] = words
+        return words
 
-def combine_sorted(wordslist, string_length, wordresult, searchcount, midword, s, max_qty):
-    """Generator of lexicographically sorted word-combinations for the primary side
-       of the palindrome:"""
-    for word in wordslist:
-        if len(dictionary_reduced[word]) > string_length: # Length of normalized representation
-            continue
-        wordresult_new = wordresult + [word]
-        if len(wordresult_new) > max_qty:
-            return
-        length_remain = string_length - len(dictionary_reduced[word])
-        if length_remain < min_word_len:
-            if searchcount:    # If primary side contained search words when function was called
-                for permutation in permutelist(wordresult_new):
-                    yield (permutation, midword, s)
+    def combine_sorted(self, string_length, wordresult, searchcount, midword, s, max_qty,
+                       resume=(), shard=0, shards=1):
+        """Generator of lexicographically sorted word-combinations for the primary side
+           of the palindrome, following on the words of wordresult. Iterative, on one buffer
+           of the words placed: per depth, the index of the word placed in the fitting words
+           of the remaining length is kept on the cursor, and backtracking moves on to the
+           next index. The indices of resume, if any, are the ones to start from. If divided
+           over shards, only the first-level indices of the given shard are taken (and the
+           primary side of wordresult alone by the first shard):"""
+        lengths = self.lengths
+        min_word_len = self.min_word_len
+        cursor = self.cursor
+        top = len(cursor)                 # Cursor index of the first depth
+        base = len(wordresult)
+        path = list(wordresult) + [None] * (max_qty + 1 - base)
+        # Per depth, the fitting words and the remaining length before its word:
+        fitting = [ self.fitting_words(string_length) ]
+        remains = [ string_length ]
+        # Whether the indices of a depth (and the ones above) are those of resume:
+        resumed = [ len(resume) > 0 ]
+        cursor.append(resume[0] if len(resume) else 0)
+        depth = 0
+        while depth >= 0:
+            words = fitting[depth]
+            remain = remains[depth]
+            count = base + depth + 1      # Number of words with the one at this depth
+            k = cursor[top + depth]
+            step = 1
+            if depth == 0 and shards > 1:  # Only the first-level indices of this shard
+                step = shards
+                k += (shard - k) % shards
+                cursor[top] = k
+            if count > max_qty and k < len(words):   # The primary side is full
+                depth = self._backtrack(fitting, remains, resumed, depth)
+                continue
+            # The words that leave too little length for another word complete a primary side:
+            while k < len(words):
+                word = words[k]
+                length_remain = remain - lengths[word]
+                if length_remain >= min_word_len:
+                    break
+                path[count - 1] = word
+                if searchcount: # If primary side contained search words when function was called
+                    for permutation in self.orderings(path[:count], midword, s):
+                        self.stats.permutations += 1
+                        yield (permutation, midword, s)
+                else:
+                    yield (path[:count], midword, s)
+                k += step
+                cursor[top + depth] = k
             else:
-                yield (wordresult_new, midword, s)
+                cursor[top + depth] = len(words)
+                if (count > 1 or midword != self.empty) and (depth or shard == 0):
+                    yield (path[:count - 1], midword, s)
+                depth = self._backtrack(fitting, remains, resumed, depth)
+                continue
+            # Otherwise one word deeper, from the resumed index if any:
+            path[count - 1] = word
+            resume_next = resumed[depth] and len(resume) > depth + 1 and k == resume[depth]
+            fitting.append(self.fitting_words(length_remain))
+            remains.append(length_remain)
+            resumed.append(resume_next)
+            cursor.append(resume[depth + 1] if resume_next else 0)
+            depth += 1
+
+    def _backtrack(self, fitting, remains, resumed, depth):
+        """Leave a depth of combine_sorted(), moving on to the next index of the one above,
+           and return the depth above:"""
+        fitting.pop()
+        remains.pop()
+        resumed.pop()
+        self.cursor.pop()
+        if depth > 0:
+            self.cursor[-1] += 1
+        return depth - 1
+
+    def combine_random(self, length_remain, wordresult, searchcount, midword, s, max_qty):
+        """Generator of random word-combinations for the primary side of the palindrome:"""
+        while True:
+            # Number of words that fit the remaining length, at the start of words_by_length:
+            fitting = self.cumulative[min(length_remain, self.total_len)]
+            if length_remain < self.min_word_len or fitting == 0:
+                if len(wordresult) or midword != self.empty:
+                    if searchcount:    # If primary side contains search words
+                        for permutation in self.orderings(wordresult, midword, s):
+                            self.stats.permutations += 1
+                            yield (permutation, midword, s)
+                    else:
+                        yield (wordresult, midword, s)
+                break
+            i = self.pick(fitting, self.length_weights)
+            word = self.words_by_length[i]
+            wordresult = wordresult + [word]
+            if len(wordresult) > max_qty:
+                break
+            length_remain = length_remain - self.lengths[word]
+
+    def orderings(self, words, midword, skew):
+        """Orderings of the words on a primary side with search words: all permutations, or
+           in the anchored search only those of which the mirror can be split into words:"""
+        if self.config.engine != "anchored":
+            orderings = permutelist(words)
         else:
-            yield from combine_sorted(wordslist, length_remain, wordresult_new, \
-                                      searchcount, midword, s, max_qty)
-    else:
-        if len(wordresult) or len(midword):
-            yield (wordresult, midword, s)
+            norm_midword = self.norm(midword)
+            if skew >= 0:  # The mirror starts with the reversed 'skew' part of the midword
+                states = self.advance(frozenset([None]), norm_midword[:skew][::-1])
+                tail = ""
+            else:          # ... or ends with it
+                states = frozenset([None])
+                tail = norm_midword[len(norm_midword)+skew:][::-1]
+            orderings = self.arrangements(words, states, tail)
+        if self.stats.timing:
+            return self.stats.timed(orderings, "orderings")
+        return orderings
 
+    def arrangements(self, words, states, tail):
+        """Orderings of the words of the anchored search, built from the last word to the first,
+           i.e. in the order of their mirror, so that an ordering is dropped as soon as the
+           mirror of the words placed so far can't be split. Iterative like permutelist(), with
+           per depth the states of the split (see _advance) after the mirror of the words
+           placed before:"""
+        n = len(words)
+        order = [None] * n
+        used = [False] * n
+        choice = [-1] * n
+        tried = [ [] for i in range(n) ]
+        stack = [states] + [None] * n
+        depth = 0
+        while depth >= 0:
+            if depth == n:
+                if None in self.advance(stack[n], tail):
+                    yield order[::-1]
+                depth -= 1
+                continue
+            i = choice[depth]
+            if i >= 0:
+                used[i] = False
+            i += 1
+            while i < n:
+                if not used[i] and words[i] not in tried[depth]:
+                    tried[depth].append(words[i])
+                    reverse = self.placements.get(words[i])
+                    if reverse is None:
+                        reverse = self.norm(words[i])[::-1]
+                    next_states = self.advance(stack[depth], reverse)
+                    if len(next_states):
+                        break
+                i += 1
+            if i == n:
+                choice[depth] = -1
+                tried[depth] = []
+                depth -= 1
+                continue
+            choice[depth] = i
+            used[i] = True
+            order[depth] = words[i]
+            stack[depth + 1] = next_states
+            depth += 1
 
-def combine_random(wordslist, length_remain, wordresult, searchcount, midword, s, max_qty):
-    """Generator of random word-combinations for the primary side of the palindrome:"""
-    while True:
-        if length_remain < min_word_len:
-            if len(wordresult) or len(midword):
-                if searchcount:    # If primary side contains search words
-                    for permutation in permutelist(wordresult):
-                        yield (permutation, midword, s)
+    def _advance(self, states, string):
+        """The states of splitting a normalized string into words, after the given states are
+           continued by string: each state is the (trie, node, depth) of a word that is still
+           in progress, or None at the end of a word. No states are left if the string can't
+           be split, or continued to be:"""
+        tries = self.tries
+        min_word_len = self.min_word_len
+        norm_args_set = self.norm_args_set
+        for c in string:
+            next_states = set()
+            for state in states:
+                if state is None:             # Any word can start here
+                    starts = [ (t, 0, 0) for t in range(len(tries)) ]
                 else:
-                    yield (wordresult, midword, s)
-            break
-        i = int(random.random() * len(wordslist))
-        word = wordslist[i]
-        if len(dictionary_reduced[word]) > length_remain:
-            continue
-        wordresult = wordresult + [word]
-        if len(wordresult) > max_qty:
-            break
-        length_remain = length_remain - len(dictionary_reduced[word])
+                    starts = [ state ]
+                for t, node, depth in starts:
+                    chars, first, keys = tries[t]
+                    node = chars.find(c, first[node], first[node+1])
+                    if node < 0:
+                        continue
+                    next_states.add((t, node, depth + 1))
+                    key = keys[node]
+                    if key >= 0 and (depth + 1 >= min_word_len or key in norm_args_set):
+                        next_states.add(None)
+            states = next_states
+            if len(states) == 0:
+                break
+        return frozenset(states)
 
+    def midword_skews(self, word):
+        """The skews of a word as midword at which it fits the palindrome length, and of which
+           the part outside its symmetry center can be mirrored: it starts the mirror if the
+           skew is positive, or ends it if negative:"""
+        normalized = self.norm(word)
+        w = len(normalized)
+        skews = []
+        for s in self.word_skews(word):
+            if (w % 2 == s % 2 and (w - abs(s))//2 + abs(s) > self.total_len//2) or \
+                    (w % 2 != s % 2 and (w - abs(s))//2 + abs(s) > (self.total_len - 1)//2):
+                break                         # As in combine()
+            if (s >= 0 and self.mirrorable(normalized[:s][::-1], start=True)) or \
+                    (s < 0 and self.mirrorable(normalized[w+s:][::-1], end=True)):
+                skews.append(s)
+        return skews
 
-def permutelist(list1, list2 = []):
-    """Generate and yield all list permutations"""
-    items = list1
-    out = list2
-    if items == []:
-        yield out
-        return
-    previous = []
-    for i in range(len(items)):
-        if items[i] not in previous:
-            previous.append(items[i])
-            yield from permutelist(items[0:i] + items[i+1:], out + items[i:i+1])
-
-
-def partitions(string, Tuple = ()):
-    """String partition generator for the secundary side of the palindrome,
-       with condition-driven switches:"""
-    if string == "":
-        yield Tuple
-        return
-    # Quantity conditions:
-    elif len(midword) == 0 and len(Tuple) >= max_word_qty // 2:
-        return
-    elif len(midword) > 0  and len(Tuple) >= (max_word_qty - 1) // 2:
-        return                                    # Skip if too many words (= substrings)
-    for i in range(len(string)):
-        # Length and existence conditions:
-        if len(string[:i+1]) < min_word_len:      # Skip at first word that's too short
-            if string[:i+1] not in norm_args_set: # ... unless it's a search word!
+    def mirrorable(self, reverse, start=False, end=False):
+        """Whether a reversed normalized string can be mirrored by words on the other side:
+           split into words, of which the first may start before it (ending with its first
+           characters) unless it's at the start of the mirror, and the last may end after it
+           unless it's at the end of the mirror:"""
+        tables = [ self.index.keys, "\n".join(self.extra_norms) + "\n" ]
+        if not start and not end and any(reverse in table for table in tables):
+            return True                       # Inside one word
+        for i in range(1 if start else len(reverse) + 1):
+            if i == 0 or any(reverse[:i] + "\n" in table for table in tables):
+                states = self.advance(frozenset([None]), reverse[i:])
+                if None in states or (len(states) and not end):
+                    return True
+        return False
+
+    def bidi(self, shard=0, shards=1):
+        """Bidirectional search engine (option -E bidi), building the left and right sides
+           together from the outside in. The outermost word on the left is the 'seed' (a search
+           word if given); every next word must be consistent with the characters that one side
+           still has pending for the other side to mirror, so that only valid palindromes result.
+           With search words, only the palindromes with all of them are complete (see extend).
+           In sorted mode all seeds are searched exhaustively; in random mode, each random seed
+           gets a randomized search with a limited budget, until it finds a palindrome, before
+           the next seed is drawn, until bidi_saturation seeds in a row gave no new ones:"""
+        total_len = self.total_len
+        if len(self.search_words):
+            seeds = [ (self.norm(word), [word]) for word in self.search_ids ]
+        else:
+            keys = dict.fromkeys(self.index.word_keys[word] for word in self.dictlist_reduced)
+            seeds = [ (self.index.key(key), self.homographs(key)) for key in keys ]
+        weights = None                    # Cumulative weights of the random seeds
+        if len(self.index.frequencies) and not self.sorted_order and not len(self.search_words):
+            weights = array('d', itertools.accumulate(
+                (sum(map(self.word_weight, words)) for key, words in seeds), initial=0))
+        if self.sorted_order:
+            budget = None
+            part, parts = self.config.part, self.config.parts     # Option --range
+            seeds = seeds[len(seeds) * part // parts:len(seeds) * (part + 1) // parts]
+            seeds = seeds[shard::shards]
+        k = -1
+        repeats = 0                       # Random seeds in a row without new palindromes
+        while True:
+            self.check_budget(self.stats.bidi_steps)
+            if self.sorted_order:
+                k += 1
+                if k == len(seeds):
+                    return
+            elif len(self.search_words):
+                k = (k + 1) % len(seeds)          # Cycle through the search words
+                budget = [bidi_budget]
+            else:
+                k = self.pick(len(seeds), weights)
+                budget = [bidi_budget]
+            key, words = seeds[k]
+            if len(key) > total_len:
                 continue
-        if string[:i+1] not in normdict:          # Skip at first word that's not in 'normdict'
-            continue
-        yield from partitions(string[i+1:], Tuple + (string[:i+1], ))
+            self.stats.bidi_seeds += 1
+            # Results yielded by this seed, and the duplicates among them as counted by generate()
+            # before the next one is asked for:
+            results, duplicates = 0, self.stats.duplicates
+            # The search words other than the seed, still to be placed:
+            needed = frozenset([ k for k, norm in self.search_keys.items() if norm != key ])
+            for left, right, length in self.extend(key, True, len(key), [-1], [], budget,
+                                                   needed):
+                # The word IDs per position, the seed words first:
+                sides = [words] + [ self.homographs(key) for key in left[1:] + right[::-1] ]
+                for combination in itertools.product(*sides):
+                    self.check_budget(self.stats.bidi_steps)   # There may be very many
+                    combination = tuple([ self.word(word) for word in combination ])
+                    if not all(word in combination for word in self.search_words):
+                        continue
+                    results += 1
+                    yield Result(combination[:len(left)], "", combination[len(left):], 0, length)
+                if budget is not None and results:    # Random mode: one palindrome per seed
+                    break
+            if budget is not None:
+                if results > self.stats.duplicates - duplicates:
+                    repeats = 0
+                else:
+                    repeats += 1
+                    if repeats == bidi_saturation:
+                        self.stopped = "exhausted"
+                        return
 
+    def extend(self, pending, on_left, length, left, right, budget, needed=frozenset()):
+        """Step of the bidirectional search from the given state. The 'pending' characters are
+           those of the longer side that the other side still has to mirror: if on_left, the
+           next word goes on the right and its reversed representation must match them,
+           otherwise the next word goes on the left and must match them. The length is that of
+           the palindrome so far, the pending characters included, and needed holds the key IDs
+           of the search words that are still to be placed: a palindrome is only complete
+           without those, and a state is given up once they don't fit the length left. Yields
+           (left, right, length), with the key IDs per position on either side, from the
+           outside in. Iterative, on a stack of the moves left per depth (see _moves), each
+           depth's word being taken back from its side before the next move of that depth:"""
+        search_keys = self.search_keys
+        stack = []               # Per depth: [moves, side, whether a word is placed, needed]
+        while True:
+            # A palindrome is complete if the pending characters themselves are symmetric:
+            if length > self.total_len - 2 * self.min_word_len and pending == pending[::-1] \
+                    and not needed:
+                yield (left, right, length)
+            # The length left for the words other than the search words still needed:
+            room = self.total_len - sum([ len(search_keys[key]) for key in needed ])
+            if length < self.total_len and len(left) + len(right) < self.max_word_qty and \
+                    length <= room:
+                self.check_budget(self.stats.bidi_steps)
+                self.stats.bidi_steps += 1
+                if budget is not None:
+                    budget[0] -= 1
+                if budget is None or budget[0] >= 0:
+                    stack.append([self._moves(pending, on_left, length, needed, room,
+                                              needed if budget is not None else ()),
+                                  right if on_left else left, False, needed])
+            # The next move of the deepest depth that has any left:
+            while len(stack):
+                frame = stack[-1]
+                if frame[2]:
+                    frame[1].pop()
+                    frame[2] = False
+                    if budget is not None and budget[0] < 0:   # Search budget used up
+                        return
+                move = next(frame[0], None)
+                if move is not None:
+                    break
+                stack.pop()
+            else:
+                return
+            key, pending, on_left, length = move
+            frame[1].append(key)
+            frame[2] = True
+            needed = frame[3] - {key} if key in frame[3] else frame[3]
 
-def make_palindromes(norm_partition_list, index, wordresult):
-    """Generate palindromes from primary words, midword and normalized secundary partitions:"""
-    for word in normdict[norm_partition_list[index]]:
-        wordresult_new = wordresult + [word]      # Get secundary words from partitions
-        if index < len(norm_partition_list) - 1:
-            make_palindromes(norm_partition_list, index + 1, wordresult_new)
-        else:
-            secundary = ' '.join(wordresult_new)
-            global count
-            count += 1
-            if count > maxcount:
-                sys.exit()
-            space1 = (len(primary) != 0) * " "
-            space2 = (len(midword) != 0) * " "
-            space3 = (len(secundary) != 0) * " "
+    def _moves(self, pending, on_left, length, needed=(), room=None, preferred=()):
+        """Generate the moves of the bidirectional search from a state (see extend): the next
+           word's key ID and the pending characters, side and length after it. Words other than
+           the needed search words may reach the length room at most. The search words of the
+           key IDs in preferred, in random mode the ones still needed, are tried first:"""
+        if room is None:
+            room = self.total_len
+        for key in preferred:
+            word = self.search_keys[key][::-1] if on_left else self.search_keys[key]
+            if length + len(word) > self.total_len:
+                continue
+            if pending.startswith(word):
+                rest = pending[len(word):]
+                yield key, rest, on_left and len(rest) > 0, length + len(word)
+            elif word.startswith(pending):
+                yield key, word[len(pending):], not on_left, length + len(word)
+        for chars, first, keys in (self.rtries if on_left else self.tries):
+            # Words that mirror part of the pending characters, the rest remains pending:
+            node = 0
+            for i in range(len(pending)):
+                node = chars.find(pending[i], first[node], first[node+1])
+                if node < 0:
+                    break
+                key = keys[node]
+                if key < 0 or length + i + 1 > self.total_len or key in preferred or \
+                        (length + i + 1 > room and key not in needed) or \
+                        (i + 1 < self.min_word_len and key not in self.norm_args_set):
+                    continue
+                rest = pending[i+1:]
+                yield key, rest, on_left and len(rest) > 0, length + i + 1
+            else:
+                # Words that mirror all pending characters, their excess becomes pending
+                # for the other side (as the needed ones are tried first if preferred, the others
+                # only go as far as the room they leave):
+                limit = (room if len(preferred) else self.total_len) - length - len(pending)
+                for extra, key in self.subtree(chars, first, keys, node, limit):
+                    if (len(pending) + len(extra) < self.min_word_len and
+                            key not in self.norm_args_set) or key in preferred or \
+                            (length + len(pending) + len(extra) > room and key not in needed):
+                        continue
+                    yield key, extra, not on_left, length + len(pending) + len(extra)
+
+    def subtree(self, chars, first, keys, node, limit):
+        """Generate (extra characters, key ID) of the words that continue below a trie node
+           by at most limit characters, alphabetically or in random order:"""
+        stack = [(node, "")]
+        while stack:
+            node, extra = stack.pop()
+            if len(extra) and keys[node] >= 0:
+                yield extra, keys[node]
+            if len(extra) < limit:
+                if self.sorted_order:             # Popped from the stack in alphabetical order
+                    children = range(first[node+1] - 1, first[node] - 1, -1)
+                else:
+                    children = list(range(first[node], first[node+1]))
+                    self.random.shuffle(children)
+                for child in children:
+                    stack.append((child, extra + chars[child]))
+
+    def split_table(self, string):
+        """Dynamic-programming tables of a normalized string:
+           - words[start] lists the (end, key ID) of each word starting at a reachable position;
+           - table[start] is the minimum number of words the rest of the string can be split into
+             (math.inf if none).
+           Only positions reachable from the start are walked, O(n * maximum word length), with
+           the words starting at each looked up by suffix (see suffix_words):"""
+        n = len(string)
+        words = [None] * (n + 1)
+        words[0] = []
+        for start in range(n):
+            if words[start] is None:              # Position can't be reached by any words
+                continue
+            found = words[start]
+            for length, key in self.suffix_words(string[start:]):
+                found.append((start + length, key))
+                if words[start + length] is None:
+                    words[start + length] = []
+        table = [math.inf] * n + [0]
+        if words[n] is not None:                  # Only if the whole string can be split
+            for start in range(n - 1, -1, -1):
+                if words[start]:
+                    table[start] = 1 + min(table[end] for end, key in words[start])
+        return words, table
+
+    def _suffix_words(self, string):
+        """The (length, key ID) of the words that a normalized string starts with, skipping
+           those shorter than the minimum word length unless a search word:"""
+        min_word_len = self.min_word_len
+        norm_args_set = self.norm_args_set
+        found = []
+        for chars, first, keys in self.tries:
+            node = 0
+            for i in range(len(string)):
+                node = chars.find(string[i], first[node], first[node+1])
+                if node < 0:                      # Stop as soon as no word continues prefix
+                    break
+                key = keys[node]
+                # Skip if no word ends here, or if it's too short, unless it's a search word:
+                if key < 0 or (i + 1 < min_word_len and key not in norm_args_set):
+                    continue
+                found.append((i + 1, key))
+        return tuple(found)
+
+    def partitions(self, words, table, max_qty):
+        """String partition generator for the secundary side of the palindrome, yielding
+           the key IDs of the words found, with condition-driven switches. Iterative, on one
+           buffer of the key IDs: per depth, the position in the string and the index of the
+           word tried in the words starting there, backtracking to the next index:"""
+        n = len(table) - 1
+        # Quantity condition, skip if the string can't be split into the word quantity:
+        if table[0] > max_qty:
+            return
+        size = min(max_qty, n)            # Maximum number of words in a partition
+        path = [0] * size
+        starts = [0] * size
+        choice = [0] * size
+        depth = 0
+        while depth >= 0:
+            found = words[starts[depth]]
+            k = choice[depth]
+            if k == len(found):           # All words starting here tried
+                depth -= 1
+                continue
+            choice[depth] = k + 1
+            end, key = found[k]
+            path[depth] = key
+            if end == n:
+                yield tuple(path[:depth + 1])
+            # Quantity condition, skip if the rest can't be split into the remaining quantity:
+            elif depth + 1 + table[end] <= max_qty:
+                depth += 1
+                starts[depth] = end
+                choice[depth] = 0
+
+    def make_palindromes(self, partition, primary, midword, skew, length):
+        """Generate palindromes from primary words, midword and secundary partition words,
+           lazily expanding the words of each key ID of the partition (its homographs):"""
+        variants = [ [ self.word(word) for word in self.homographs(key) ] for key in partition ]
+        for secundary in itertools.product(*variants):
             if skew >= 0:
-                print_palindrome(primary + space1 + midword + space2 + secundary)
+                yield Result(primary, midword, secundary, skew, length)
                 if skew == 0:
-                    print_palindrome(secundary + space3 + midword + space2 + primary)
+                    yield Result(secundary, midword, primary, skew, length)
             else:
-                print_palindrome(secundary + space3 + midword + space2 + primary)
+                yield Result(secundary, midword, primary, skew, length)
+
+
+class OutputSink:
+    """Buffered writer of results to standard output and optionally to the logfile, which is
+       opened once. Results are written as plain text, or as newline-delimited JSON or as TSV
+       with their metadata. The buffer is flushed when it holds buffer_lines lines, when
+       results have been waiting for flush_interval seconds (by a timer thread, so also while
+       the next result is being searched for), and on close:"""
+
+    def __init__(self, stream=None, logpath=None, fmt="text", buffer_lines=1000,
+                 flush_interval=0.5):
+        if fmt not in output_formats:
+            raise ValueError("unknown output format: %s" % fmt)
+        self.stream = stream or sys.stdout
+        self.log = open(logpath, "a") if logpath else None
+        self.fmt = fmt
+        self.buffer_lines = max(1, buffer_lines)
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.waiting = None               # Since when the oldest buffered result is waiting
+        self.lock = threading.RLock()     # Between the writes and the timer thread
+        self.closed = threading.Event()
+        self.error = None                 # BrokenPipeError of the timer thread, raised on write
+        if self.buffer_lines > 1:
+            threading.Thread(target=self.flush_timer, daemon=True).start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def format(self, result):
+        """Render one result as a line in the output format:"""
+        if self.fmt == "json":
+            return json.dumps({"palindrome": str(result), "length": result.length,
+                               "words": len(result.left) + len(result.right) + (len(result.mid) > 0),
+                               "skew": result.skew, "midword": result.mid,
+                               "left": result.left, "right": result.right}, ensure_ascii=False)
+        elif self.fmt == "tsv":
+            return "%s\t%d\t%d\t%d\t%s" % (str(result), result.length,
+                                          len(result.left) + len(result.right) + (len(result.mid) > 0),
+                                          result.skew, result.mid)
+        return str(result)
+
+    def write(self, result):
+        """Buffer one result, and flush the buffer if it's full:"""
+        line = self.format(result)
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            if len(self.buffer) == 0:
+                self.waiting = time.monotonic()
+            self.buffer.append(line)
+            if len(self.buffer) >= self.buffer_lines:
+                self.flush()
+
+    def flush_timer(self):
+        """Timer thread flushing the buffer once its oldest result has been waiting for
+           flush_interval seconds, until the sink is closed:"""
+        delay = self.flush_interval
+        while not self.closed.wait(delay):
+            with self.lock:
+                delay = self.flush_interval
+                if len(self.buffer) == 0 or self.error is not None:
+                    continue
+                delay = self.waiting + self.flush_interval - time.monotonic()
+                if delay <= 0:
+                    delay = self.flush_interval
+                    try:
+                        self.flush()
+                    except BrokenPipeError as error:
+                        self.error = error
 
+    def flush(self):
+        """Write the buffered lines, to the logfile first. Raises BrokenPipeError if standard
+           output has been closed, e.g. by 'head':"""
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            if len(self.buffer) == 0:
+                return
+            data = "\n".join(self.buffer) + "\n"
+            self.buffer = []
+            if self.log is not None:
+                self.log.write(data)
+                self.log.flush()
+            self.stream.write(data)
+            self.stream.flush()
 
-def print_palindrome(string):
-    """Write results to standard output and optionally to logfile:"""
-    print(string)
-    if logmode:
-        with open(logfile, "a") as myfile:
-            myfile.write(string + "\n")
+    def close(self):
+        """Stop the timer thread, flush the buffer and close the logfile:"""
+        self.closed.set()
+        try:
+            self.flush()
+        finally:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+
+class PalindromeServer:
+    """Server (option --serve) of palindrome requests on a Unix socket or a localhost TCP port,
+       with the word indexes loaded once and kept in memory (the serve_indexes most recently
+       used ones, or as many as preloaded), in threads while other requests are answered. A request is one line of JSON
+       with any of the settings of the command line options, e.g.:
+           {"language": "a", "length": 20, "min_word_len": 3, "max_word_qty": 1000,
+            "exclude": "", "words": ["race"], "count": 10, "sorted": false, "seed": null,
+            "engine": "combine", "time": 10, "candidates": null}
+       The results are streamed back as JSON lines (as option -O json) as soon as they are
+       found, followed by one line {"done": true, ...} with the number of results, the seconds
+       taken and why the request stopped: "end", "count", "time" (the time budget in seconds,
+       at most serve_budget), "candidates" (the budget "candidates" of primaries and bidi
+       steps, as option --max-candidates), "exhausted" or "empty" (as in stop_reasons).
+       Requests are answered in forked worker processes, at most jobs at once, which share
+       the warm word indexes and the prepared generators:"""
+
+    def __init__(self, preload, excl_chars="0123456789", jobs=1):
+        self.excl_chars = excl_chars      # Characters excluded by default (option -x)
+        self.indexes = {}                 # Word indexes per language and excluded characters
+        self.generators = {}              # Prepared generators (both the least recent first)
+        import multiprocessing
+        self.context = multiprocessing.get_context("fork")
+        self.jobs = jobs
+        self.pool = None                  # Semaphore of the worker processes, once serving
+        self.preload = preload            # Languages loaded before serving
+        self.index_limit = max(serve_indexes, len(preload))   # Word indexes kept
+        self.language = preload[0] if len(preload) else "d"   # Default language
+
+    def cached(self, cache, key, limit, function, *args):
+        """The future of function(*args) kept in cache under key, now as the most recent. If
+           not there yet (or failed before), it's run in a thread of the executor of the event
+           loop, so that other requests are answered meanwhile, and the least recent entries
+           are evicted to keep at most limit. Returns the future and the evicted keys:"""
+        import asyncio
+        future = cache.pop(key, None)
+        evicted = []
+        if future is None or (future.done() and future.exception() is not None):
+            future = asyncio.get_running_loop().run_in_executor(None, function, *args)
+            while len(cache) >= limit:
+                evicted.append(next(iter(cache)))
+                del cache[evicted[-1]]
+        cache[key] = future
+        return future, evicted
+
+    async def index(self, language, excl_chars):
+        """The word index of a language with excluded characters, loaded when first needed:"""
+        if language not in languages:
+            raise ValueError("unknown language: %s" % language)
+        future, evicted = self.cached(self.indexes, (language, excl_chars), self.index_limit,
+                                      WordIndex.load, languages[language], language, excl_chars)
+        for key in evicted:               # Their generators would keep the index in memory
+            for generator_key in [ k for k in self.generators if k[:2] == key ]:
+                del self.generators[generator_key]
+        return await future
+
+    async def generator(self, request):
+        """The prepared generator for the settings of a request:"""
+        language = request.get("language", self.language)
+        excl_chars = self.excl_chars + request.get("exclude", "")
+        config = Config(int(request.get("min_word_len", 1)),
+                        int(request.get("max_word_qty", 1000)),
+                        int(request.get("length", 30)), bool(request.get("sorted", False)),
+                        request.get("words", ()), engine=request.get("engine", "combine"))
+        key = (language, excl_chars, config.min_word_len, config.max_word_qty, config.total_len,
+               config.sorted_order, tuple(config.search_words), config.engine)
+        index = await self.index(language, excl_chars)
+        future, evicted = self.cached(self.generators, key, serve_generators,
+                                      PalindromeGenerator, index, config)
+        return await future
+
+    def _worker(self, generator, seed, count, budget, candidates, fd):
+        """Worker process writing the results of one request to a pipe, as JSON lines,
+           followed by one line {"stopped": ...} if the generator stopped early:"""
+        generator.random.seed(seed)       # Without seed, forked workers must still differ
+        generator.timeout = budget
+        generator.max_candidates = candidates
+        try:
+            with os.fdopen(fd, "w") as stream, \
+                    OutputSink(stream=stream, fmt="json", buffer_lines=1) as sink:
+                for result in itertools.islice(generator.generate(), count):
+                    sink.write(result)
+                if generator.stopped not in (None, "end"):
+                    sink.flush()
+                    stream.write(json.dumps({"stopped": generator.stopped}) + "\n")
+        except BrokenPipeError:           # The request was stopped
+            pass
+
+    async def request(self, request, writer):
+        """Answer one request, streaming the results to the client:"""
+        import asyncio
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        budget = min(float(request.get("time", serve_budget)), serve_budget)
+        count = request.get("count")
+        if count is not None:
+            count = int(count)
+        candidates = request.get("candidates")
+        if candidates is not None:
+            candidates = int(candidates)
+        generator = await self.generator(request)
+        results = 0
+        stopped = "end"
+        async with self.pool:
+            deadline = loop.time() + budget
+            read_fd, write_fd = os.pipe()
+            process = self.context.Process(target=self._worker, daemon=True,
+                                           args=(generator, request.get("seed"), count, budget,
+                                                 candidates, write_fd))
+            process.start()
+            os.close(write_fd)
+            reader = asyncio.StreamReader()
+            transport, protocol = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb"))
+            try:
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), deadline - loop.time())
+                    if not line:
+                        break
+                    if line.startswith(b'{"stopped"'):
+                        stopped = json.loads(line)["stopped"]
+                        continue
+                    results += 1
+                    writer.write(line)
+                    await writer.drain()
+            except asyncio.TimeoutError:
+                stopped = "time"
+            finally:
+                transport.close()
+                process.terminate()
+                await loop.run_in_executor(None, process.join)
+        if count is not None and results >= count:
+            stopped = "count"
+        return {"done": True, "results": results, "seconds": time.perf_counter() - start,
+                "stopped": stopped}
+
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection, one per line:"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if type(request) is not dict:
+                        raise ValueError("request is not a JSON object")
+                    summary = await self.request(request, writer)
+                except (ValueError, TypeError, OSError) as error:
+                    summary = {"done": True, "error": str(error)}
+                writer.write((json.dumps(summary) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:           # The client went away
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address):
+        """Serve on a Unix socket path, or on a TCP port of localhost if address is a number:"""
+        import asyncio
+        self.pool = asyncio.Semaphore(self.jobs)
+        for language in self.preload:
+            await self.index(language, self.excl_chars)
+        if address.isdigit():
+            server = await asyncio.start_server(self.handle, "127.0.0.1", int(address))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)                # Left by a previous server
+            server = await asyncio.start_unix_server(self.handle, address)
+        async with server:
+            await server.serve_forever()
 
 
 dictionary_nl = "/usr/share/dict/dutch"
@@ -326,33 +2048,55 @@ dictionary_de = "/usr/share/hunspell/de_DE_frami.dic"
 dictionary_fr = "/usr/share/dict/french"
 dictionary_sp = "/usr/share/dict/spanish"
 dictionary_it = "/usr/share/dict/italian"
+# Language file per language option:
+languages = {"a": dictionary_am, "b": dictionary_br, "d": dictionary_nl, "f": dictionary_fr,
+             "g": dictionary_de, "i": dictionary_it, "s": dictionary_sp}
 
-dictionarylist  = to_list(dictionary_nl, "d")  # Dutch is default language
+cache_version   = "5"
+# Tables of the compiled dictionary in the order of the cache file, with their array type,
+# or None for a newline-separated string table (see WordIndex):
+dictionary_tables = (("words", None), ("keys", None), ("word_starts", 'i'), ("key_starts", 'i'),
+                     ("lengths", 'i'), ("word_keys", 'i'), ("key_words", 'i'),
+                     ("key_word_starts", 'i'), ("skew_starts", 'i'), ("skews", 'i'),
+                     ("trie_chars", None), ("trie_first", 'i'), ("trie_keys", 'i'),
+                     ("rtrie_chars", None), ("rtrie_first", 'i'), ("rtrie_keys", 'i'),
+                     ("frequencies", 'd'))
+normal_chars    = {}           # Translation table of normalized characters, filled as needed
+cachedir        = os.path.join(os.environ.get("XDG_CACHE_HOME") or
+                               os.path.join(os.path.expanduser("~"), ".cache"), "palindromes")
 logfile         = "./logfile"
-logmode         = 0
-min_word_len    = 1
-max_word_qty    = 1000
-total_len       = 30           # Or allow *each* length if option -L is not given?
-excl_chars      = "0123456789"
-sorted_order    = 0
-count           = 0
-maxcount        = math.inf
+output_formats  = ("text", "json", "tsv")  # Output formats (option -O)
+engines         = ("combine", "bidi", "anchored")  # Search engines (option -E)
+bidi_budget     = 2000         # Search steps per random seed in the bidirectional engine
+bidi_saturation = 10000        # Random seeds in a row without new results after which bidi stops
+stats_interval  = 0.5          # Seconds between statistics of worker processes
+serve_budget    = 60           # Maximum seconds per server request (option --serve)
+serve_generators = 32          # Prepared generators kept by the server
+serve_indexes   = 4            # Word indexes kept by the server
+checkpoint_interval = 10       # Seconds between checkpoints of the sorted sweep
+startup_target  = 0.2          # Seconds aimed at from module import to generation, warm cache
+saturation      = 100000       # Repeated primary sides in a row after which random mode stops
+stop_reasons    = {"time": "time budget used up", "candidates": "candidate budget used up",
+                   "exhausted": "no new palindromes found",
+                   "empty": "no palindromes possible with these settings"}
+tried_limit     = 250000       # Primary sides remembered exactly, twice as many at most
+seen_limit      = 250000       # Results deduplicated exactly, ...
+seen_bits       = 2**26        # ... beyond that by Bloom filters of this many bits,
+seen_hashes     = 7            # ... setting this many bits per item
+wordlist_chunk  = 65536        # Lines of a word list read, normalized and indexed at once
+frequency_bias  = 0.5          # Power of the word frequencies in the random sampling weights
 
 # Regular expressions:
-a_acc = re.compile('[áàäâåÁÀÄÂ]')
-e_acc = re.compile('[éèëêÉÈËÊ]')
-i_acc = re.compile('[ïíìÏÍÌ]')
-o_acc = re.compile('[óòöôøÓÒÖÔ]')
-u_acc = re.compile('[üûÜÛ]')
-n_til = re.compile('[ñÑ]')
-c_ced = re.compile('[çÇ]')
 intpunct = re.compile('[\'\" :.&-]')
 slashtag = re.compile('\/[^/]*')      # Backslash kan/moet vermoedelijk vervallen hier
 
 # Text printed if -h option (help) or a non-existent option has been given:
 usage = """
 Usage:
-palindromes.py [-abdfghiscFlLqxS] [WORD(1) [ ... WORD(n)]]
+palindromes.py [-abdfghisBcEFjlLOqxS] [--seed SEED] [--stats] [--stats-interval SECONDS]
+               [--range PART/PARTS] [--checkpoint FILE] [--timeout SECONDS]
+               [--max-candidates COUNT] [--wordlist PATH] [WORD(1) [ ... WORD(n)]]
+palindromes.py [-abdfgisjx] --serve ADDRESS
 \t-a	American-English
 \t-b	British-English
 \t-d	Dutch
@@ -361,147 +2105,340 @@ palindromes.py [-abdfghiscFlLqxS] [WORD(1) [ ... WORD(n)]]
 \t-h	Help (this output)
 \t-i	Italian
 \t-s	Spanish
+\t-B LINES
+\t	Buffer output per LINES lines (default 1000)
 \t-c COUNT
 \t	Limit output to COUNT results
+\t-E ENGINE
+\t	Search engine: combine (default), bidi (bidirectional) or anchored (search words)
 \t-F	Write output to logfile
+\t-j JOBS
+\t	Generate palindromes in JOBS parallel processes
 \t-l MINWORDLEN
 \t	Filter results to palindromes w/ words of at least MINWORDLEN
 \t-L LENGTH
 \t	Filter results to palindromes of approx. LENGTH (default 30)
+\t-O FORMAT
+\t	Output format: text (default), json or tsv
 \t-q MAXQTY
 \t	Filter results to palindromes with <= approx. MAXQTY words
 \t-x EXCLCHARS
 \t	Exclude words with any of these EXCLCHARS
 \t-S	Sorted palindrome generation
+\t--seed SEED
+\t	Seed the random generation, for reproducible results
+\t--stats
+\t	Write statistics per generation stage to standard error at exit
+\t--stats-interval SECONDS
+\t	Also write them as JSON to standard error every SECONDS
+\t--range PART/PARTS
+\t	Generate only PART (1 to PARTS) of the sorted sweep divided in PARTS parts
+\t--checkpoint FILE
+\t	Save the position in the sorted sweep to FILE, and resume from there if it exists
+\t--timeout SECONDS
+\t	Stop generating after SECONDS
+\t--max-candidates COUNT
+\t	Stop generating after trying COUNT candidates (primary sides or search steps)
+\t--wordlist PATH
+\t	Also read the words of PATH (.gz or .xz if compressed), one per line, optionally
+\t	followed by a tab and their frequency, to which random generation is biased;
+\t	instead of the language file if no language is set (repeatable)
+\t--serve ADDRESS
+\t	Serve requests on Unix socket ADDRESS, or on localhost port ADDRESS if a number,
+\t	with the word lists of the language options (default all) loaded once,
+\t	answering up to JOBS requests at once
 """
 
-# Select option(s):
-try:
-    options, non_option_args = getopt.getopt(sys.argv[1:], 'abdfghisc:Fl:L:q:x:S')
-except:
-    print(usage)
-    sys.exit()
 
-for opt, arg in options:
-    if opt in ('-h'):
+def stats_report(index, generator, elapsed):
+    """Statistics of a run as a dictionary: the loading and generation stage durations
+       in seconds and the stage counters:"""
+    stats = generator.report_stats()
+    report = stats.snapshot()
+    report["times"].update(index.times)
+    report["times"].update(generator.times)
+    report["elapsed"] = elapsed
+    if generator.config.engine == "bidi":
+        report["engine"] = "bidi"
+    elif generator.sorted_order:
+        report["engine"] = generator.config.engine + "_sorted"
+    else:
+        report["engine"] = generator.config.engine + "_random"
+    return report
+
+
+def print_stats(report):
+    """Print the statistics summary of a run to standard error:"""
+    times = report["times"]
+    lines = ["Statistics after %.3f s (%s):" % (report["elapsed"], report["engine"])]
+    for name, label in (("import", "Module import"),
+                        ("read", "Dictionary read"), ("normalize", "Normalize"),
+                        ("skews", "Skew computation"), ("load", "Dictionary load"),
+                        ("index", "Index build"), ("generator", "Generator setup"),
+                        ("combine", "Primary generation"), ("orderings", "  of which orderings"),
+                        ("split_table", "Split tables"), ("partitions", "Partition enumeration")):
+        if name in times:
+            lines.append("  %-28s %10.3f s" % (label, times[name]))
+    if "startup" in times:
+        lines.append("  %-28s %10.3f s (target %.3f s)" % ("Startup", times["startup"],
+                                                            startup_target))
+    for name, label in (("primaries", "Primaries generated"),
+                        ("permutations", "Permutelist expansions"),
+                        ("rejected", "Rejected by split table"),
+                        ("partition_attempts", "Partition attempts"),
+                        ("partitions", "Partitions found"),
+                        ("bidi_seeds", "Bidirectional seeds"),
+                        ("bidi_steps", "Bidirectional search steps"),
+                        ("repeated", "Repeated primaries skipped"),
+                        ("duplicates", "Duplicate results skipped"),
+                        ("results", "Results emitted")):
+        lines.append("  %-28s %10d" % (label, report[name]))
+    lines.append("  %-28s %10d / %d" % ("Split table suffix hits", report["split_hits"],
+                                         report["split_hits"] + report["split_misses"]))
+    print("\n".join(lines), file=sys.stderr)
+
+
+def main():
+    """Command line interface:"""
+    dictionary      = dictionary_nl  # Dutch is default language
+    language        = "d"
+    min_word_len    = 1
+    max_word_qty    = 1000
+    total_len       = 30           # Or allow *each* length if option -L is not given?
+    excl_chars      = "0123456789"
+    sorted_order    = 0
+    count           = 0
+    maxcount        = math.inf
+    jobs            = 1            # Number of worker processes
+    logmode         = 0
+    output_format   = "text"
+    buffer_lines    = 1000         # Output buffer size in lines
+    engine          = "combine"
+    seed            = None
+    statsmode       = 0
+    stats_every     = 0            # Seconds between JSON statistics, 0 if none
+    address         = None         # Server socket path or port (option --serve)
+    part, parts     = 0, 1         # Part of the sorted sweep (option --range)
+    checkpointfile  = None         # Checkpoint of the sorted sweep (option --checkpoint)
+    timeout         = None         # Seconds to generate (option --timeout)
+    max_candidates  = None         # Candidates to try (option --max-candidates)
+    wordlists       = []           # Word lists besides or instead of the language file
+    start           = time.perf_counter()
+
+    # Select option(s):
+    try:
+        options, non_option_args = getopt.getopt(sys.argv[1:], 'abdfghisB:c:E:Fj:l:L:O:q:x:S',
+                                                 ['seed=', 'stats', 'stats-interval=', 'serve=',
+                                                  'range=', 'checkpoint=', 'timeout=',
+                                                  'max-candidates=', 'wordlist='])
+    except:
         print(usage)
         sys.exit()
-    elif opt in ('-a'):
-        dictionarylist = to_list(dictionary_am, "a")
-    elif opt in ('-b'):
-        dictionarylist = to_list(dictionary_br, "b")
-    elif opt in ('-d'):
-        dictionarylist = to_list(dictionary_nl, "d")
-    elif opt in ('-f'):
-        dictionarylist = to_list(dictionary_fr, "f")
-    elif opt in ('-g'):
-        dictionarylist = to_list(dictionary_de, "g")
-    elif opt in ('-i'):
-        dictionarylist = to_list(dictionary_it, "i")
-    elif opt in ('-s'):
-        dictionarylist = to_list(dictionary_sp, "s")
-    elif opt in ('-c'):
-        maxcount = int(arg)
-    elif opt in ('-F'):
-        logmode = 1
-    elif opt in ('-l'):
-        min_word_len = int(arg)
-    elif opt in ('-L'):
-        total_len = int(arg)
-    elif opt in ('-q'):
-        max_word_qty = int(arg)
-    elif opt in ('-x'):
-        excl_chars = excl_chars + arg
-    elif opt in ('-S'):
-        sorted_order = 1
-
-
-# Prevent negative min_word_len, total_len < min_word_len or max word quantity < 1:
-if min_word_len <= 0 or total_len < min_word_len or max_word_qty < 1:
-    sys.exit()
-
-# Prevent min_word_len to be smaller than shortest word in list:
-shortest = 10
-for word in dictionarylist:
-    if len(word) < shortest:
-        shortest = len(word)
-if min_word_len < shortest:
-    min_word_len = shortest
-
-# Convert the non-option word arguments to normalized words and join together to string:
-norm_args = normalize(''.join(non_option_args))
-
-# Length ratio between half palindrome and search string, to be used in combine() function:
-if len(non_option_args):
-    length_ratio = max(1, total_len//(2*len(norm_args)))
-
-# Generate word dictionary with all words per unique normalized representation:
-normdict           = {}    # Dictionary with key = normalized word, value = list of words
-symmetry_skews     = {}    # Symmetry 'skews' dictionary
-dictionary_reduced = {}    # Reduced dictionary with key = word, value = normalized word
-dictlist_reduced   = []    # Reduced wordlist
-norm_args_set      = set() # Set of normalized non_option_args
-
-# The empty midword has one 'skew': 0
-symmetry_skews[""] = [0]
-
-# The empty (normalized) word:
-dictionary_reduced[""] = ""
-
-# Prepare all databases:
-for word in dictionarylist + non_option_args:
-    total_len_fault = 0
-    if contains(word, excl_chars):
-        if word in non_option_args:
+
+    for opt, arg in options:
+        if opt in ('-h'):
+            print(usage)
             sys.exit()
-        continue
-    normalized = normalize(word)
-    if len(normalized) > total_len or (max_word_qty == 1 and len(normalized) < total_len):
-        total_len_fault = 1
-    if word in non_option_args:
-        if total_len_fault:
+        elif opt in ('-a'):
+            dictionary, language = dictionary_am, "a"
+        elif opt in ('-b'):
+            dictionary, language = dictionary_br, "b"
+        elif opt in ('-d'):
+            dictionary, language = dictionary_nl, "d"
+        elif opt in ('-f'):
+            dictionary, language = dictionary_fr, "f"
+        elif opt in ('-g'):
+            dictionary, language = dictionary_de, "g"
+        elif opt in ('-i'):
+            dictionary, language = dictionary_it, "i"
+        elif opt in ('-s'):
+            dictionary, language = dictionary_sp, "s"
+        elif opt in ('-B'):
+            buffer_lines = int(arg)
+        elif opt in ('-c'):
+            maxcount = int(arg)
+        elif opt in ('-E'):
+            engine = arg
+        elif opt in ('-F'):
+            logmode = 1
+        elif opt in ('-j'):
+            jobs = int(arg)
+        elif opt in ('-l'):
+            min_word_len = int(arg)
+        elif opt in ('-L'):
+            total_len = int(arg)
+        elif opt in ('-O'):
+            output_format = arg
+        elif opt in ('-q'):
+            max_word_qty = int(arg)
+        elif opt in ('-x'):
+            excl_chars = excl_chars + arg
+        elif opt in ('-S'):
+            sorted_order = 1
+        elif opt in ('--seed'):
+            seed = int(arg)
+        elif opt in ('--stats'):
+            statsmode = 1
+        elif opt in ('--stats-interval'):
+            statsmode = 1
+            stats_every = float(arg)
+        elif opt in ('--serve'):
+            address = arg
+        elif opt in ('--range'):
+            try:
+                part, parts = map(int, arg.split("/"))
+                part -= 1
+            except ValueError:
+                sys.exit()
+        elif opt in ('--checkpoint'):
+            checkpointfile = arg
+        elif opt in ('--timeout'):
+            timeout = float(arg)
+        elif opt in ('--max-candidates'):
+            max_candidates = int(arg)
+        elif opt in ('--wordlist'):
+            wordlists.append(arg)
+
+    # Server mode, with the word lists of the given language options, or else all:
+    if address is not None:
+        preload = [ opt[1] for opt, arg in options if opt[1:] in languages ]
+        if len(preload) == 0:
+            preload = [ language for language in languages if os.path.exists(languages[language]) ]
+        if jobs < 1:
             sys.exit()
-        norm_args_set.add(word)
-    elif len(normalized) < min_word_len or total_len_fault:
-        continue
-    symmetry_skews[word] = get_skews(normalized)
-    dictionary_reduced[word] = normalized
-    dictlist_reduced.append(word)
-    if normalized in normdict:
-        normdict[normalized].append(word)
+        server = PalindromeServer(preload, excl_chars, jobs)
+        import asyncio
+        try:
+            asyncio.run(server.serve(address))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if not address.isdigit() and os.path.exists(address):
+                os.unlink(address)
+        return
+
+    # Prevent invalid settings or jobs < 1:
+    try:
+        config = Config(min_word_len, max_word_qty, total_len, sorted_order, non_option_args,
+                        seed=seed, engine=engine, part=part, parts=parts)
+    except ValueError:
+        sys.exit()
+    if jobs < 1 or output_format not in output_formats:
+        sys.exit()
+    if (timeout is not None and timeout <= 0) or maxcount < 1 or \
+            (max_candidates is not None and max_candidates < 1):
+        sys.exit()
+    # Checkpoints are of the sorted sweep of combine() (not of bidi()), in one process:
+    if checkpointfile is not None and (not sorted_order or engine == "bidi" or jobs > 1):
+        sys.exit()
+
+    # Word lists (option --wordlist) replace the language file, unless a language is set:
+    if len(wordlists) and not any(opt[1:] in languages for opt, arg in options):
+        dictionary, language = None, None
+
+    # Load the word index from the (cached) compiled dictionary:
+    try:
+        index = WordIndex.load(dictionary, language, excl_chars, wordlists)
+    except (OSError, ValueError) as error:
+        sys.exit(str(error))
+    generator = PalindromeGenerator(index, config)
+    generator.stats.timing = statsmode
+    generator.timeout = timeout
+    generator.max_candidates = max_candidates
+
+    # Resume the sorted sweep from the checkpoint, if any, made with the same settings:
+    if checkpointfile is not None:
+        settings = {"excl_chars": excl_chars,
+                    "min_word_len": min_word_len, "max_word_qty": max_word_qty,
+                    "total_len": total_len, "search_words": non_option_args,
+                    "sorted_order": sorted_order, "engine": engine,
+                    "part": part, "parts": parts}
+        if dictionary is not None:
+            stat = os.stat(dictionary)
+            settings.update({"dictionary": os.path.abspath(dictionary),
+                             "mtime": stat.st_mtime_ns, "size": stat.st_size})
+        if len(wordlists):
+            settings["wordlists"] = [ [os.path.abspath(wordlist), stat.st_mtime_ns, stat.st_size]
+                                      for wordlist, stat in zip(wordlists,
+                                                                map(os.stat, wordlists)) ]
+        try:
+            checkpoint = load_checkpoint(checkpointfile, settings)
+        except ValueError as error:
+            sys.exit(str(error))
+        if checkpoint["done"]:
+            return
+        generator.resume = checkpoint["position"]
+        generator.resume_seen = checkpoint.get("seen")
+
+        def save(position, done=False):
+            sink.flush()              # So that the output matches the checkpoint
+            checkpoint["position"] = position
+            if generator.seen is not None:
+                checkpoint["seen"] = generator.seen.state()
+            checkpoint["results"] = written + count
+            checkpoint["done"] = done
+            save_checkpoint(checkpointfile, checkpoint)
+
+        generator.checkpoint = save
+        written = checkpoint["results"]
+
+    # Startup time, from the start of the module import until the generation starts:
+    generator.times["import"] = import_time
+    generator.times["startup"] = time.perf_counter() - import_start
+
+    # Periodically write the statistics as JSON to standard error:
+    stopped = threading.Event()
+
+    def write_stats():
+        while not stopped.wait(stats_every):
+            report = stats_report(index, generator, time.perf_counter() - start)
+            print(json.dumps(report), file=sys.stderr, flush=True)
+
+    if stats_every > 0:
+        threading.Thread(target=write_stats, daemon=True).start()
+
+    if jobs > 1:
+        results = generator.generate_parallel(jobs)
     else:
-        normdict[normalized] = [word]
-
-# If option -q = 1 or option -l > palindrome-length/2, print all single-word palindromes:
-if max_word_qty == 1 or min_word_len * 2 > total_len:
-    for word in symmetry_skews:
-        if 0 in symmetry_skews[word] and \
-                (len(non_option_args) == 0 or word in non_option_args):
-            print_palindrome(word)
-    sys.exit()
-
-# Otherwise, combine the dictionary words to multi-word palindromes:
-for (combination, midword, skew) in combine(dictlist_reduced, total_len, non_option_args):
-    primary = ' '.join(combination)
-    norm_primary = normalize(primary)
-    norm_midword = dictionary_reduced[midword]
-
-    s = skew
-    w = len(norm_midword)
-    p = len(norm_primary)
-
-    if skew >= 0:
-        norm_string = (norm_primary + norm_midword)[:p+abs(s)]
-    elif skew < 0:
-        norm_string = (norm_midword + norm_primary)[w-abs(s):]
-
-    if len(norm_string) == 0:             # Iff primary is empty AND midword is palindrome!
-        print_palindrome(midword)         # Hence result is the palindrome midword only
-        count += 1
-        if count > maxcount:
-            sys.exit()
-        continue
+        results = generator.generate()
+    sink = OutputSink(logpath=logfile if logmode else None, fmt=output_format,
+                      buffer_lines=buffer_lines)
+    finished = False
+    try:
+        with sink:
+            try:
+                for result in results:
+                    sink.write(result)
+                    generator.stats.results += 1
+                    count += 1
+                    if count == maxcount:     # Don't search on for a result beyond COUNT
+                        break
+                else:
+                    finished = generator.stopped == "end"
+            except KeyboardInterrupt:     # Stop at Ctrl-C, after writing what's buffered
+                pass
+            finally:
+                results.close()
+            if checkpointfile is not None:
+                save(generator.position or generator.resume, finished)
+    except BrokenPipeError:
+        # Standard output was closed by the reader, so stop quietly:
+        # https://docs.python.org/3/library/signal.html#note-on-sigpipe
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    finally:
+        stopped.set()
+        if statsmode:
+            print_stats(stats_report(index, generator, time.perf_counter() - start))
+        # Why the run stopped, unless at the end of the sorted sweep or after COUNT results:
+        if generator.stopped in stop_reasons:
+            stats = generator.report_stats()
+            print("Stopped after %.3f s: %s; %d results, %d candidates" %
+                  (time.perf_counter() - start, stop_reasons[generator.stopped],
+                   stats.results, stats.primaries + stats.bidi_steps), file=sys.stderr)
+
+
+import_time = time.perf_counter() - import_start   # Duration of the module import
 
-    # Generate results by mirroring the normalized string from primary to secundary side
-    for p in partitions(norm_string[::-1]): # Reversed string partitioned
-        make_palindromes(p, 0, [])          # Generate matching palindrome word-combination
+if __name__ == "__main__":
+    main()